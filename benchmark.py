@@ -0,0 +1,892 @@
+"""Benchmarks for the simulation
+
+Each benchmark returns a list of result rows (dictionaries) which are
+printed as a table by main(). Run a benchmark from the command line, e.g.
+
+    python benchmark.py queue --sizes 10000 100000 1000000 10000000
+
+The results can be saved as JSON, together with a description of the
+machine, and later results compared against them: every rate (a column
+ending in _per_sec) that fell, and every time or size (ending in seconds or
+bytes) that grew, by more than the threshold is reported as a regression.
+
+    python benchmark.py queue dispatcher --json baseline.json
+    python benchmark.py queue dispatcher --compare baseline.json
+"""
+from __future__ import annotations
+import argparse
+import datetime
+import json
+import os
+import platform
+import random
+import subprocess
+import sys
+import tempfile
+import time
+import tracemalloc
+from operator import attrgetter
+from typing import Callable, Dict, List, Optional
+from container import BucketQueue, Container, PriorityQueue
+from dispatcher import BatchDispatcher, Dispatcher
+from driver import Driver
+from event import DriverRequest, Event, RiderRequest, create_event_list, \
+    iter_events
+from eventfile import EventColumns, attach_event_columns, \
+    convert_event_file, open_event_file, parse_file, parse_lines
+from fleet import Fleet
+from monitor import PICKUP, Activity, Monitor, StreamingMonitor, \
+    WindowedMetrics
+import location
+from location import Location, deserialize_location
+from rider import Rider
+from simulation import Simulation
+from spill import SpillingMonitor
+from sweep import sweep
+from workload import Workload
+
+
+QUEUE_SIZES = [10 ** 4, 10 ** 5, 10 ** 6, 10 ** 7]
+FLEET_SIZES = [10 ** 3, 10 ** 4, 5 * 10 ** 4]
+GRID_SIZE = 500
+RIDER_COUNTS = [10 ** 3, 10 ** 4]
+LINE_COUNTS = [10 ** 5, 10 ** 6]
+THROUGHPUT_FLEETS = [10 ** 2, 10 ** 3, 10 ** 4]
+# The relative change beyond which a result is reported as a regression.
+THRESHOLD = 0.1
+# The sorted list is quadratic; larger sizes take hours.
+SORTED_LIST_MAX_SIZE = 10 ** 4
+
+
+class _SortedListQueue(Container):
+    """The original sorted-list PriorityQueue, kept as a reference point.
+
+    """
+
+    def __init__(self) -> None:
+        self._items = []
+
+    def add(self, item: object) -> None:
+        i = 0
+        while i < len(self._items) and item >= self._items[i]:
+            i += 1
+        self._items.insert(i, item)
+
+    def remove(self) -> object:
+        return self._items.pop(0)
+
+    def is_empty(self) -> bool:
+        return len(self._items) == 0
+
+
+def _random_events(size: int, seed: int = 0) -> List[Event]:
+    """Return <size> events whose timestamps are drawn uniformly from a range
+    as wide as <size>, so roughly one event shares each timestamp.
+
+    """
+    rng = random.Random(seed)
+    return [Event(rng.randrange(size)) for _ in range(size)]
+
+
+def _time_queue(make_queue: Callable[[], Container], size: int,
+                seed: int = 0) -> Dict[str, float]:
+    """Time filling a queue with <size> events and then emptying it, followed
+    by <size> "hold" operations (a remove followed by an add a short time in
+    the future), which is how Simulation.run uses its queue.
+
+    """
+    events = _random_events(size, seed)
+    rng = random.Random(seed + 1)
+    increments = [rng.randrange(1, 30) for _ in range(size)]
+
+    queue = make_queue()
+    start = time.perf_counter()
+    queue.extend(events)
+    while not queue.is_empty():
+        queue.remove()
+    drain = time.perf_counter() - start
+
+    queue = make_queue()
+    queue.extend(events)
+    start = time.perf_counter()
+    for increment in increments:
+        event = queue.remove()
+        queue.add(Event(event.timestamp + increment))
+    hold = time.perf_counter() - start
+
+    return {"size": size,
+            "fill_drain_events_per_sec": 2 * size / drain,
+            "hold_events_per_sec": 2 * size / hold}
+
+
+def bench_queue(sizes: List[int]) -> List[Dict[str, float]]:
+    """Benchmark PriorityQueue for each queue size in <sizes>.
+
+    """
+    return [_time_queue(PriorityQueue, size) for size in sizes]
+
+
+def bench_queues(sizes: List[int]) -> List[Dict[str, float]]:
+    """Compare the event queue implementations for each size in <sizes>.
+
+    The sorted list is only run up to SORTED_LIST_MAX_SIZE.
+    """
+    queues = [("sorted_list", _SortedListQueue), ("heap", PriorityQueue),
+              ("bucket", BucketQueue)]
+    rows = []
+    for size in sizes:
+        for name, make_queue in queues:
+            if name == "sorted_list" and size > SORTED_LIST_MAX_SIZE:
+                continue
+            row = {"queue": name}
+            row.update(_time_queue(make_queue, size))
+            rows.append(row)
+    return rows
+
+
+def _random_location(rng: random.Random) -> Location:
+    """Return a random location on a GRID_SIZE by GRID_SIZE grid.
+
+    """
+    return Location(rng.randrange(GRID_SIZE), rng.randrange(GRID_SIZE))
+
+
+def bench_dispatch(sizes: List[int], requests: int = 2000
+                   ) -> List[Dict[str, float]]:
+    """Benchmark Dispatcher.request_driver with a fleet of each size in
+    <sizes> idle drivers. After each match the driver is returned to the
+    fleet at the rider's destination, so the fleet size stays constant.
+
+    """
+    rows = []
+    for size in sizes:
+        rng = random.Random(size)
+        dispatcher = Dispatcher()
+        fleet = Fleet()
+        for i in range(size):
+            driver = Driver("d{}".format(i), _random_location(rng),
+                            rng.choice([1, 2, 3]), fleet)
+            dispatcher.request_rider(driver)
+        riders = [Rider("r{}".format(i), 10, _random_location(rng),
+                        _random_location(rng)) for i in range(requests)]
+        start = time.perf_counter()
+        for rider in riders:
+            driver = dispatcher.request_driver(rider)
+            driver.location = rider.destination
+            dispatcher.request_rider(driver)
+        elapsed = time.perf_counter() - start
+        rows.append({"fleet": size, "matches_per_sec": requests / elapsed})
+    return rows
+
+
+def bench_dispatcher(sizes: List[int], requests: int = 2000
+                     ) -> List[Dict[str, float]]:
+    """Time each operation of Dispatcher with a fleet of each size in
+    <sizes>: registering the idle drivers with request_rider, then
+    <requests> calls of request_driver that are matched, and <requests>
+    calls of cancel_ride on riders left waiting once no driver is idle.
+
+    """
+    rows = []
+    for size in sizes:
+        rng = random.Random(size)
+        dispatcher = Dispatcher()
+        fleet = Fleet()
+        drivers = [Driver("d{}".format(i), _random_location(rng),
+                          rng.choice([1, 2, 3]), fleet) for i in range(size)]
+        matched = [Rider("r{}".format(i), 10, _random_location(rng),
+                         _random_location(rng))
+                   for i in range(min(requests, size))]
+        waiting = [Rider("w{}".format(i), 10, _random_location(rng),
+                         _random_location(rng)) for i in range(requests)]
+
+        start = time.perf_counter()
+        for driver in drivers:
+            dispatcher.request_rider(driver)
+        registered = time.perf_counter() - start
+        start = time.perf_counter()
+        for rider in matched:
+            dispatcher.request_driver(rider)
+        requested = time.perf_counter() - start
+
+        dispatcher = Dispatcher()
+        for rider in waiting:
+            dispatcher.request_driver(rider)
+        rng.shuffle(waiting)
+        start = time.perf_counter()
+        for rider in waiting:
+            dispatcher.cancel_ride(rider)
+        cancelled = time.perf_counter() - start
+
+        for name, calls, elapsed in [
+                ("request_rider", len(drivers), registered),
+                ("request_driver", len(matched), requested),
+                ("cancel_ride", len(waiting), cancelled)]:
+            rows.append({"fleet": size, "operation": name,
+                         "calls_per_sec": calls / elapsed})
+    return rows
+
+
+def bench_fleet(sizes: List[int], queries: int = 200
+                ) -> List[Dict[str, float]]:
+    """Compare computing the travel times of a whole fleet of each size in
+    <sizes> through Fleet.travel_times with calling Driver.get_travel_time
+    on every driver.
+
+    """
+    rows = []
+    for size in sizes:
+        rng = random.Random(size)
+        fleet = Fleet()
+        drivers = [Driver("d{}".format(i), _random_location(rng),
+                          rng.choice([1, 2, 3]), fleet) for i in range(size)]
+        origins = [_random_location(rng) for _ in range(queries)]
+        start = time.perf_counter()
+        for origin in origins:
+            [driver.get_travel_time(origin) for driver in drivers]
+        per_driver = time.perf_counter() - start
+        start = time.perf_counter()
+        for origin in origins:
+            fleet.travel_times(origin)
+        columnar = time.perf_counter() - start
+        rows.append({"fleet": size,
+                     "driver_loop_per_sec": size * queries / per_driver,
+                     "fleet_columns_per_sec": size * queries / columnar})
+    return rows
+
+
+class _DictRider:
+    """A rider as it was stored before Rider had __slots__.
+
+    """
+
+    def __init__(self, identifier: str, patience: int, origin: Location,
+                 destination: Location) -> None:
+        self.id = identifier
+        self.patience = patience
+        self.origin = origin
+        self.destination = destination
+        self.status = "waiting"
+
+
+class _DictDriver:
+    """A driver as it was stored before drivers were views onto a Fleet.
+
+    """
+
+    def __init__(self, identifier: str, location: Location,
+                 speed: int) -> None:
+        self.id = identifier
+        self.location = location
+        self.speed = speed
+        self.destination = None
+        self.is_idle = True
+
+
+class _DictActivity:
+    """An activity as it was stored before Activity had __slots__.
+
+    """
+
+    def __init__(self, timestamp: int, description: str, identifier: str,
+                 location: Location) -> None:
+        self.time = timestamp
+        self.description = description
+        self.id = identifier
+        self.location = location
+
+
+def bench_memory(sizes: List[int]) -> List[Dict[str, float]]:
+    """Measure the bytes allocated per rider, driver and activity, for each
+    number of actors in <sizes>, before and after they were made compact.
+    The drivers' bytes include their share of the Fleet columns.
+
+    Identifiers and locations are allocated up front, since both
+    representations share them.
+    """
+    rows = []
+    for size in sizes:
+        ids = ["a{}".format(i) for i in range(size)]
+        locations = [Location(i % GRID_SIZE, i // GRID_SIZE % GRID_SIZE)
+                     for i in range(size)]
+        fleet = Fleet()
+        actors = [
+            ("rider",
+             lambda i: _DictRider(ids[i], 10, locations[i], locations[-i]),
+             lambda i: Rider(ids[i], 10, locations[i], locations[-i])),
+            ("driver",
+             lambda i: _DictDriver(ids[i], locations[i], 1),
+             lambda i: Driver(ids[i], locations[i], 1, fleet)),
+            ("activity",
+             lambda i: _DictActivity(i, "pickup", ids[i], locations[i]),
+             lambda i: Activity(i, PICKUP, ids[i], locations[i]))]
+        for name, before, after in actors:
+            row = {"actors": size, "kind": name}
+            for label, make in [("before", before), ("after", after)]:
+                tracemalloc.start()
+                objects = [make(i) for i in range(size)]
+                allocated = tracemalloc.get_traced_memory()[0]
+                tracemalloc.stop()
+                del objects
+                row[label + "_bytes_per_actor"] = allocated / size
+            rows.append(row)
+    return rows
+
+
+def _random_scenario(drivers: int, riders: int, seed: int = 0
+                     ) -> List[Event]:
+    """Return the initial events of a scenario where <drivers> drivers
+    start at time 0, and <riders> riders arrive, on average 10 per time unit,
+    at random locations on the grid.
+
+    """
+    rng = random.Random(seed)
+    fleet = Fleet()
+    events = [DriverRequest(0, Driver("d{}".format(i), _random_location(rng),
+                                      rng.choice([1, 2, 3]), fleet))
+              for i in range(drivers)]
+    timestamp = 0
+    for i in range(riders):
+        timestamp += int(rng.expovariate(10.0))
+        rider = Rider("r{}".format(i), 10 ** 6, _random_location(rng),
+                      _random_location(rng))
+        events.append(RiderRequest(timestamp, rider))
+    return events
+
+
+def bench_matching(sizes: List[int], drivers: int = 500, window: int = 5
+                   ) -> List[Dict[str, float]]:
+    """Compare greedy matching with batch matching over windows of <window>
+    time units, for scenarios with each number of riders in <sizes>.
+
+    """
+    policies = [("greedy", Dispatcher),
+                ("batch", lambda: BatchDispatcher(window))]
+    rows = []
+    for size in sizes:
+        for name, make_dispatcher in policies:
+            events = _random_scenario(drivers, size, seed=size)
+            simulation = Simulation(dispatcher=make_dispatcher())
+            start = time.perf_counter()
+            report = simulation.run(events)
+            elapsed = time.perf_counter() - start
+            rows.append({"policy": name, "riders": size,
+                         "riders_per_sec": size / elapsed,
+                         "driver_total_distance":
+                             report["driver_total_distance"],
+                         "rider_wait_time": report["rider_wait_time"]})
+    return rows
+
+
+def _write_event_file(path: str, lines: int, seed: int = 0,
+                      grid_size: int = 50) -> None:
+    """Write an event file of <lines> events to <path>: one driver for every
+    ten riders, on a <grid_size> by <grid_size> grid, about ten events per
+    time unit.
+
+    """
+    rng = random.Random(seed)
+
+    def random_cell() -> str:
+        return "{},{}".format(rng.randrange(grid_size),
+                              rng.randrange(grid_size))
+
+    with open(path, "w") as file:
+        for i in range(lines):
+            timestamp = i // 10
+            if i % 11 == 0:
+                file.write("{} DriverRequest d{} {} {}\n".format(
+                    timestamp, i, random_cell(), rng.choice([1, 2, 3])))
+            else:
+                file.write("{} RiderRequest r{} {} {} {}\n".format(
+                    timestamp, i, random_cell(), random_cell(),
+                    rng.randrange(5, 30)))
+
+
+def _measure(function: Callable[[], object]) -> Dict[str, float]:
+    """Call <function> twice and return its running time in seconds and
+    the peak memory it allocated in bytes, as measured by tracemalloc.
+
+    """
+    start = time.perf_counter()
+    function()
+    elapsed = time.perf_counter() - start
+    tracemalloc.start()
+    result = function()
+    peak = tracemalloc.get_traced_memory()[1]
+    tracemalloc.stop()
+    del result
+    return {"seconds": elapsed, "peak_bytes": peak}
+
+
+def bench_parse(sizes: List[int]) -> List[Dict[str, float]]:
+    """Measure parsing an event file of each number of lines in <sizes>,
+    and deserializing just its locations with and without interning.
+
+    """
+    rows = []
+    with tempfile.TemporaryDirectory() as directory:
+        for size in sizes:
+            path = os.path.join(directory, "events.txt")
+            _write_event_file(path, size)
+            with open(path) as file:
+                tokens = [token for line in file
+                          for token in line.split()[3:5] if "," in token]
+
+            def fresh() -> List[Location]:
+                return [Location(*map(int, token.split(",")))
+                        for token in tokens]
+
+            def interned() -> List[Location]:
+                # Start from an empty cache so its entries are counted.
+                location._interned.clear()
+                return [deserialize_location(token) for token in tokens]
+
+            for name, function in [
+                    ("create_event_list", lambda: create_event_list(path)),
+                    ("locations_fresh", fresh),
+                    ("locations_interned", interned)]:
+                row = {"lines": size, "step": name}
+                row.update(_measure(function))
+                rows.append(row)
+    return rows
+
+
+def bench_load(sizes: List[int]) -> List[Dict[str, float]]:
+    """Measure loading an event file of each number of lines in <sizes>
+    from the text format and from the binary format, both as columns and
+    as events.
+
+    """
+    rows = []
+    with tempfile.TemporaryDirectory() as directory:
+        for size in sizes:
+            text = os.path.join(directory, "events.txt")
+            binary = os.path.join(directory, "events.bin")
+            _write_event_file(text, size)
+            convert_event_file(text, binary)
+
+            def text_columns() -> EventColumns:
+                with open(text) as file:
+                    return parse_lines(file)
+
+            def binary_columns() -> int:
+                with open_event_file(binary) as columns:
+                    return sum(columns.timestamps)
+
+            def binary_events() -> List[Event]:
+                with open_event_file(binary) as columns:
+                    return list(columns.events())
+
+            for name, function in [
+                    ("text_events", lambda: list(iter_events(text))),
+                    ("binary_events", binary_events),
+                    ("text_columns", text_columns),
+                    ("binary_columns", binary_columns)]:
+                row = {"lines": size, "step": name}
+                row.update(_measure(function))
+                rows.append(row)
+    return rows
+
+
+def _process_counts() -> List[int]:
+    """Return 1, 2, 4, ... up to the number of cores, and the number of
+    cores itself.
+
+    """
+    cores = os.cpu_count() or 1
+    counts = [1]
+    while counts[-1] * 2 <= cores:
+        counts.append(counts[-1] * 2)
+    if counts[-1] != cores:
+        counts.append(cores)
+    return counts
+
+
+def bench_parallel_parse(sizes: List[int]) -> List[Dict[str, float]]:
+    """Measure the throughput of parse_file on an event file of each number
+    of lines in <sizes>, with 1, 2, 4, ... worker processes up to the number
+    of cores.
+
+    """
+    rows = []
+    with tempfile.TemporaryDirectory() as directory:
+        for size in sizes:
+            path = os.path.join(directory, "events.txt")
+            _write_event_file(path, size)
+            for processes in _process_counts():
+                start = time.perf_counter()
+                parse_file(path, processes)
+                elapsed = time.perf_counter() - start
+                rows.append({"lines": size, "processes": processes,
+                             "lines_per_sec": size / elapsed})
+    return rows
+
+
+class _RecordingMonitor(Monitor):
+    """A monitor that also records the arguments of every notification.
+
+    """
+
+    def __init__(self) -> None:
+        super().__init__()
+        self.notifications = []
+
+    def notify(self, *args: object) -> None:
+        self.notifications.append(args)
+        super().notify(*args)
+
+
+def bench_monitor(sizes: List[int], drivers: int = 1000
+                  ) -> List[Dict[str, float]]:
+    """Replay the notifications of a simulation with each number of riders
+    in <sizes> into each kind of monitor, and measure the time and peak
+    memory of the notifications and the report. The spilling monitor has a
+    memory budget of 1 MiB.
+
+    """
+    rows = []
+    with tempfile.TemporaryDirectory() as directory:
+        path = os.path.join(directory, "activities.seg")
+        for size in sizes:
+            recorder = _RecordingMonitor()
+            Simulation(monitor=recorder).run(
+                _random_scenario(drivers, size, seed=size))
+            notifications = recorder.notifications
+            for name, make_monitor in [
+                    ("monitor", Monitor),
+                    ("streaming", StreamingMonitor),
+                    ("spilling", lambda: SpillingMonitor(
+                        path, chunk_size=4096, memory_budget=1 << 20))]:
+
+                timings = {}
+
+                def replay() -> Dict[str, float]:
+                    monitor = make_monitor()
+                    start = time.perf_counter()
+                    for args in notifications:
+                        monitor.notify(*args)
+                    if isinstance(monitor, SpillingMonitor):
+                        monitor.log.close()
+                    middle = time.perf_counter()
+                    report = monitor.report()
+                    # Only the first replay runs without tracemalloc.
+                    timings.setdefault("notify", middle - start)
+                    timings.setdefault("report",
+                                       time.perf_counter() - middle)
+                    return report
+
+                row = {"riders": size, "monitor": name}
+                row.update(_measure(replay))
+                row["notify_per_sec"] = len(notifications) / timings["notify"]
+                row["report_seconds"] = timings["report"]
+                rows.append(row)
+    return rows
+
+
+def bench_windows(sizes: List[int], drivers: int = 1000
+                  ) -> List[Dict[str, float]]:
+    """Time Simulation.run on scenarios with each number of riders in
+    <sizes>, with and without windowed metrics, to measure their overhead.
+
+    """
+    rows = []
+    for size in sizes:
+        for name, make_monitor in [
+                ("none", Monitor),
+                ("windows", lambda: Monitor(windows=WindowedMetrics(10)))]:
+            events = _random_scenario(drivers, size, seed=size)
+            simulation = Simulation(monitor=make_monitor())
+            start = time.perf_counter()
+            simulation.run(events)
+            elapsed = time.perf_counter() - start
+            rows.append({"windows": name, "riders": size,
+                         "riders_per_sec": size / elapsed})
+    return rows
+
+
+def bench_sweep(sizes: List[int], riders: int = 2000
+                ) -> List[Dict[str, float]]:
+    """Measure the throughput of sweeps of each number of runs in <sizes>,
+    with 1, 2, 4, ... worker processes up to the number of cores.
+
+    """
+    rows = []
+    with tempfile.TemporaryDirectory() as directory:
+        path = os.path.join(directory, "events.txt")
+        _write_event_file(path, riders)
+        for size in sizes:
+            configs = [{"speed": 1 + i % 3, "patience": 5 + i}
+                       for i in range(size)]
+            for processes in _process_counts():
+                start = time.perf_counter()
+                for _ in sweep(path, configs, processes):
+                    pass
+                elapsed = time.perf_counter() - start
+                rows.append({"runs": size, "processes": processes,
+                             "runs_per_sec": size / elapsed})
+    return rows
+
+
+def bench_shared(sizes: List[int]) -> List[Dict[str, float]]:
+    """Measure the time and memory it takes a process to get the columns of
+    an event file of each number of lines in <sizes>: by parsing the text
+    file, or by attaching to a copy already in shared memory.
+
+    """
+    rows = []
+    with tempfile.TemporaryDirectory() as directory:
+        for size in sizes:
+            path = os.path.join(directory, "events.txt")
+            _write_event_file(path, size)
+            block = parse_file(path, 1).share()
+
+            def attach() -> int:
+                with attach_event_columns(block.name) as columns:
+                    return len(columns)
+
+            try:
+                for name, function in [("parse", lambda: parse_file(path, 1)),
+                                       ("attach", attach)]:
+                    row = {"lines": size, "step": name}
+                    row.update(_measure(function))
+                    rows.append(row)
+            finally:
+                block.close()
+                block.unlink()
+    return rows
+
+
+def bench_simulation(sizes: List[int], drivers: int = 1000
+                     ) -> List[Dict[str, float]]:
+    """Time Simulation.run on scenarios with each number of riders in
+    <sizes>, with the heap ordered through Event.__lt__, the heap keyed by
+    timestamp (the default), and the bucket queue.
+
+    """
+    queues = [("heap_event_lt", PriorityQueue),
+              ("heap_timestamp_key", lambda: None),
+              ("bucket", BucketQueue)]
+    rows = []
+    for size in sizes:
+        for name, make_queue in queues:
+            events = _random_scenario(drivers, size, seed=size)
+            simulation = Simulation(make_queue())
+            start = time.perf_counter()
+            simulation.run(events)
+            elapsed = time.perf_counter() - start
+            rows.append({"queue": name, "riders": size,
+                         "riders_per_sec": size / elapsed})
+    return rows
+
+
+class _CountingQueue(PriorityQueue):
+    """The default event queue of Simulation, counting the events removed.
+
+    """
+
+    def __init__(self) -> None:
+        super().__init__(key=attrgetter("timestamp"))
+        self.removed = 0
+
+    def remove(self) -> object:
+        self.removed += 1
+        return super().remove()
+
+
+def bench_throughput(sizes: List[int],
+                     fleets: Optional[List[int]] = None
+                     ) -> List[Dict[str, float]]:
+    """Measure the events per second done by Simulation.run on a synthetic
+    workload with each number of riders in <sizes> and each number of
+    drivers in <fleets> (by default, THROUGHPUT_FLEETS).
+
+    """
+    rows = []
+    for drivers in fleets or THROUGHPUT_FLEETS:
+        for size in sizes:
+            workload = Workload(drivers=drivers, riders=size, seed=size)
+            queue = _CountingQueue()
+            simulation = Simulation(queue)
+            start = time.perf_counter()
+            simulation.run(workload.events())
+            elapsed = time.perf_counter() - start
+            events = drivers + size + queue.removed
+            rows.append({"drivers": drivers, "riders": size,
+                         "events_per_sec": events / elapsed})
+    return rows
+
+
+BENCHMARKS = {
+    "queue": (bench_queue, QUEUE_SIZES),
+    "queues": (bench_queues, QUEUE_SIZES[:3]),
+    "dispatch": (bench_dispatch, FLEET_SIZES),
+    "fleet": (bench_fleet, FLEET_SIZES),
+    "parse": (bench_parse, LINE_COUNTS),
+    "load": (bench_load, LINE_COUNTS),
+    "parallel_parse": (bench_parallel_parse, LINE_COUNTS),
+    "memory": (bench_memory, [10 ** 5, 10 ** 6]),
+    "matching": (bench_matching, RIDER_COUNTS),
+    "monitor": (bench_monitor, RIDER_COUNTS),
+    "windows": (bench_windows, RIDER_COUNTS),
+    "sweep": (bench_sweep, [8, 32]),
+    "shared": (bench_shared, LINE_COUNTS),
+    "simulation": (bench_simulation, RIDER_COUNTS + [10 ** 5]),
+    "dispatcher": (bench_dispatcher, FLEET_SIZES),
+    "throughput": (bench_throughput, RIDER_COUNTS + [10 ** 5]),
+}
+
+
+def _print_rows(rows: List[Dict[str, float]]) -> None:
+    """Print result rows as an aligned table.
+
+    """
+    if not rows:
+        return
+    columns = list(rows[0])
+    table = [columns]
+    for row in rows:
+        cells = []
+        for column in columns:
+            value = row.get(column, "")
+            if isinstance(value, float):
+                value = "{:.{}f}".format(value, 3 if abs(value) < 100 else 1)
+            cells.append(str(value))
+        table.append(cells)
+    widths = [max(len(line[i]) for line in table)
+              for i in range(len(columns))]
+    for line in table:
+        print("  ".join(c.rjust(w) for c, w in zip(line, widths)))
+
+
+def metadata() -> Dict[str, object]:
+    """Return a description of this machine and of the code benchmarked.
+
+    """
+    try:
+        commit = subprocess.run(
+            ["git", "rev-parse", "HEAD"], capture_output=True, text=True,
+            cwd=os.path.dirname(os.path.abspath(__file__)),
+            check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        commit = None
+    return {"time": datetime.datetime.now().isoformat(timespec="seconds"),
+            "commit": commit,
+            "python": platform.python_version(),
+            "implementation": platform.python_implementation(),
+            "platform": platform.platform(),
+            "machine": platform.machine(),
+            "processor": platform.processor(),
+            "cpus": os.cpu_count()}
+
+
+def _direction(column: str) -> int:
+    """Return 1 if a higher value of <column> is better, -1 if a lower one
+    is, or 0 if it is not a measurement to compare.
+
+    """
+    if column.endswith("per_sec"):
+        return 1
+    if column.endswith(("seconds", "bytes", "bytes_per_actor")):
+        return -1
+    return 0
+
+
+def _row_key(row: Dict[str, object]) -> tuple:
+    """Return the parameters that identify <row> among the rows of its
+    benchmark: its columns that are not floats or measurements.
+
+    """
+    return tuple(sorted((column, value) for column, value in row.items()
+                        if not _direction(column)
+                        and not isinstance(value, float)))
+
+
+def compare(baseline: Dict[str, List[Dict[str, object]]],
+            results: Dict[str, List[Dict[str, object]]],
+            threshold: float = THRESHOLD) -> List[Dict[str, object]]:
+    """Return a row for each measurement in <results> that is worse than
+    the same measurement in <baseline> by more than <threshold>, relative to
+    the baseline. Both map the name of each benchmark to its rows.
+
+    >>> baseline = {"queue": [{"size": 10, "hold_events_per_sec": 100.0}]}
+    >>> compare(baseline, {"queue": [{"size": 10,
+    ...                               "hold_events_per_sec": 95.0}]})
+    []
+    >>> compare(baseline, {"queue": [{"size": 10,
+    ...                               "hold_events_per_sec": 80.0}]})
+    ... # doctest: +NORMALIZE_WHITESPACE
+    [{'benchmark': 'queue', 'row': 'size=10',
+      'measurement': 'hold_events_per_sec', 'baseline': 100.0,
+      'current': 80.0, 'change': -0.2}]
+    """
+    regressions = []
+    for name, rows in results.items():
+        before = {_row_key(row): row for row in baseline.get(name, [])}
+        for row in rows:
+            key = _row_key(row)
+            if key not in before:
+                continue
+            for column, value in row.items():
+                direction = _direction(column)
+                old = before[key].get(column)
+                if not direction or not isinstance(old, (int, float)) \
+                        or not old:
+                    continue
+                change = (value - old) / old
+                if change * direction < -threshold:
+                    regressions.append({
+                        "benchmark": name,
+                        "row": " ".join("{}={}".format(*item)
+                                        for item in key),
+                        "measurement": column, "baseline": old,
+                        "current": value, "change": round(change, 3)})
+    return regressions
+
+
+def main() -> None:
+    """Run the benchmarks named on the command line.
+
+    Exit with status 1 if results are compared with a baseline and there
+    are regressions.
+    """
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("benchmarks", nargs="*", metavar="benchmark",
+                        help="one of: " + ", ".join(sorted(BENCHMARKS)))
+    parser.add_argument("--sizes", nargs="+", type=int,
+                        help="override the default problem sizes")
+    parser.add_argument("--json", metavar="PATH",
+                        help="save the results and machine metadata as JSON")
+    parser.add_argument("--compare", metavar="BASELINE",
+                        help="compare the results with JSON saved earlier")
+    parser.add_argument("--threshold", type=float, default=THRESHOLD,
+                        help="the relative change reported as a regression "
+                             "(default: %(default)s)")
+    args = parser.parse_args()
+    unknown = set(args.benchmarks) - set(BENCHMARKS)
+    if unknown:
+        parser.error("unknown benchmark: " + ", ".join(sorted(unknown)))
+    results = {}
+    for name in args.benchmarks or sorted(BENCHMARKS):
+        function, sizes = BENCHMARKS[name]
+        print("== {} ==".format(name))
+        results[name] = function(args.sizes or sizes)
+        _print_rows(results[name])
+    if args.json:
+        with open(args.json, "w") as file:
+            json.dump({"metadata": metadata(), "results": results}, file,
+                      indent=2)
+    if args.compare:
+        with open(args.compare) as file:
+            baseline = json.load(file)["results"]
+        regressions = compare(baseline, results, args.threshold)
+        print("== regressions against {} ==".format(args.compare))
+        if not regressions:
+            print("none beyond {:.0%}".format(args.threshold))
+        _print_rows(regressions)
+        if regressions:
+            sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -1,4 +1,15 @@
 """Containers of objects"""
+from collections import deque
+from heapq import heapify, heappop, heappush
+from itertools import count
+from operator import attrgetter
+from typing import Callable, Dict, Iterable, Optional
+
+# Entry fields of the queues below. An entry is a list so that it can be
+# handed out as a handle and marked dead in place; its last two fields are
+# always the item and whether it is alive.
+_ITEM = -2
+_ALIVE = -1
 
 
 class Container:
@@ -7,9 +18,11 @@ class Container:
     This is an abstract class.  Only child classes should be instantiated.
     """
 
-    def add(self, item: object) -> None:
+    def add(self, item: object) -> Optional[object]:
         """Add <item> to this Container.
 
+        Return a handle that can be passed to cancel(), or None if this
+        Container does not support cancellation.
         """
         raise NotImplementedError("Implemented in a subclass")
 
@@ -19,6 +32,30 @@ class Container:
         """
         raise NotImplementedError("Implemented in a subclass")
 
+    def extend(self, items: Iterable) -> None:
+        """Add every item in <items> to this Container, in order.
+
+        Subclasses may override this with a faster bulk insertion.
+        """
+        for item in items:
+            self.add(item)
+
+    def peek(self) -> object:
+        """Return the item that remove() would return, without removing it.
+
+        Precondition: <self> should not be empty.
+        """
+        raise NotImplementedError("Implemented in a subclass")
+
+    def cancel(self, handle: object) -> None:
+        """Cancel the item that was added with <handle>, so that it is never
+        removed from this Container.
+
+        Cancelling an item that has already been removed or cancelled does
+        nothing.
+        """
+        raise NotImplementedError("Implemented in a subclass")
+
     def is_empty(self) -> bool:
         """Return True iff this Container is empty.
 
@@ -35,26 +72,70 @@ class PriorityQueue(Container):
     removed.
 
     Priority is defined by the rich comparison methods for the objects in the
-    container (__lt__, __le__, __gt__, __ge__).
+    container (__lt__, __le__, __gt__, __ge__), or, if a <key> function is
+    given, by the rich comparison methods of key(x) for each object x.
 
     If x < y, then x has a *HIGHER* priority than y.
 
     All objects in the container must be of the same type.
+
+    A key such as an integer timestamp makes every comparison in the heap a
+    native comparison instead of a call to the objects' __lt__ method.
+
+    Cancelled items are left in place and skipped when they reach the front
+    of the queue. Once they make up more than <compact_threshold> of the
+    stored entries, the queue is rebuilt without them.
+
+    === Attributes ===
+    live: The number of items that are waiting to be removed.
+    dead: The number of cancelled items that are still stored.
+    compact_threshold: The fraction of stored entries that may be dead
+        before the queue is compacted.
     """
 
+    live: int
+    dead: int
+    compact_threshold: float
+
     # === Private Attributes ===
     _items: list
-    #     The items stored in the priority queue.
+    #     The entries stored in the priority queue. Each entry is a list
+    #     [priority, sequence number, item, alive], where the priority is the
+    #     item itself or its key.
+    _key: Optional[Callable[[object], object]]
+    #     The key function that gives the priority of an item, if any.
+    _counter: count
+    #     Source of the sequence numbers given to new entries.
     #
     # === Representation Invariants ===
-    # _items is a sorted list, where the first item in the queue is the
-    # item with the highest priority.
+    # _items is a binary min-heap (see the heapq module), so _items[0] is the
+    # entry for the item with the highest priority.
+    # Sequence numbers strictly increase in insertion order, so two entries
+    # whose items compare equal are ordered by when they were inserted.
+    # live + dead == len(_items), and dead entries have alive set to False.
 
-    def __init__(self) -> None:
-        """Initialize an empty PriorityQueue.
+    def __init__(self, key: Optional[Callable[[object], object]] = None,
+                 compact_threshold: float = 0.5) -> None:
+        """Initialize an empty PriorityQueue that orders items by <key>, or
+        by the items themselves if <key> is None.
 
         """
         self._items = []
+        self._key = key
+        self._counter = count()
+        self.live = 0
+        self.dead = 0
+        self.compact_threshold = compact_threshold
+
+    def __len__(self) -> int:
+        """Return the number of items in this PriorityQueue.
+
+        >>> pq = PriorityQueue()
+        >>> pq.extend(["red", "blue"])
+        >>> len(pq)
+        2
+        """
+        return self.live
 
     def remove(self) -> object:
         """Remove and return the next item from this PriorityQueue.
@@ -62,10 +143,7 @@ class PriorityQueue(Container):
         Precondition: <self> should not be empty.
 
         >>> pq = PriorityQueue()
-        >>> pq.add("red")
-        >>> pq.add("blue")
-        >>> pq.add("yellow")
-        >>> pq.add("green")
+        >>> pq.extend(["red", "blue", "yellow", "green"])
         >>> pq.remove()
         'blue'
         >>> pq.remove()
@@ -75,7 +153,32 @@ class PriorityQueue(Container):
         >>> pq.remove()
         'yellow'
         """
-        return self._items.pop(0)
+        items = self._items
+        entry = heappop(items)
+        while not entry[_ALIVE]:
+            self.dead -= 1
+            entry = heappop(items)
+        entry[_ALIVE] = False
+        self.live -= 1
+        return entry[_ITEM]
+
+    def peek(self) -> object:
+        """Return the next item of this PriorityQueue without removing it.
+
+        Precondition: <self> should not be empty.
+
+        >>> pq = PriorityQueue()
+        >>> pq.extend(["red", "blue"])
+        >>> pq.peek()
+        'blue'
+        >>> len(pq)
+        2
+        """
+        items = self._items
+        while not items[0][_ALIVE]:
+            heappop(items)
+            self.dead -= 1
+        return items[0][_ITEM]
 
     def is_empty(self) -> bool:
         """
@@ -84,31 +187,275 @@ class PriorityQueue(Container):
         >>> pq = PriorityQueue()
         >>> pq.is_empty()
         True
-        >>> pq.add("thing")
+        >>> pq.extend(["thing"])
         >>> pq.is_empty()
         False
         """
-        return len(self._items) == 0
+        return self.live == 0
+
+    def add(self, item: object) -> list:
+        """Add <item> to this PriorityQueue and return its handle.
 
-    def add(self, item: object) -> None:
-        """Add <item> to this PriorityQueue.
+        Items that compare equal are removed in the order they were added.
 
         >>> pq = PriorityQueue()
-        >>> pq.add("yellow")
-        >>> pq.add("blue")
-        >>> pq.add("red")
-        >>> pq.add("green")
-        >>> pq._items
+        >>> pq.extend(["yellow", "blue"])
+        >>> handle = pq.add("red")
+        >>> pq.extend(["green"])
+        >>> [pq.remove() for _ in range(4)]
         ['blue', 'green', 'red', 'yellow']
+        >>> pq = PriorityQueue(key=len)
+        >>> pq.extend(["yellow", "blue", "red", "green"])
+        >>> [pq.remove() for _ in range(4)]
+        ['red', 'blue', 'green', 'yellow']
+        """
+        priority = item if self._key is None else self._key(item)
+        entry = [priority, next(self._counter), item, True]
+        heappush(self._items, entry)
+        self.live += 1
+        return entry
+
+    def extend(self, items: Iterable) -> None:
+        """Add every item in <items> to this PriorityQueue, in order.
+
+        The new entries are appended and the heap is rebuilt once, which is
+        linear in the size of the queue rather than a push per item.
+
+        >>> pq = PriorityQueue()
+        >>> pq.extend(["red"])
+        >>> pq.extend(["yellow", "blue", "red"])
+        >>> [pq.remove() for _ in range(4)]
+        ['blue', 'red', 'red', 'yellow']
+        """
+        counter, key = self._counter, self._key
+        size = len(self._items)
+        if key is None:
+            self._items.extend([item, next(counter), item, True]
+                               for item in items)
+        else:
+            self._items.extend([key(item), next(counter), item, True]
+                               for item in items)
+        self.live += len(self._items) - size
+        heapify(self._items)
+
+    def cancel(self, handle: list) -> None:
+        """Cancel the item that was added with <handle>.
+
+        >>> pq = PriorityQueue()
+        >>> pq.extend(["red", "yellow"])
+        >>> handle = pq.add("blue")
+        >>> pq.cancel(handle)
+        >>> pq.live, pq.dead
+        (2, 1)
+        >>> pq.remove()
+        'red'
+        >>> pq.live, pq.dead
+        (1, 0)
+        """
+        if not handle[_ALIVE]:
+            return
+        handle[_ALIVE] = False
+        self.live -= 1
+        self.dead += 1
+        if self.live == 0:
+            self._items.clear()
+            self.dead = 0
+        elif self.dead > self.compact_threshold * len(self._items):
+            self._compact()
+
+    def _compact(self) -> None:
+        """Rebuild the heap without the dead entries.
+
+        """
+        self._items = [entry for entry in self._items if entry[_ALIVE]]
+        heapify(self._items)
+        self.dead = 0
+
+
+class BucketQueue(Container):
+    """A priority queue for items with small non-negative integer keys.
+
+    Items are grouped into one FIFO bucket per key, and the keys that
+    currently have a bucket are kept in a min-heap. Removing the item with
+    the smallest key pops from the front of the first bucket, and adding an
+    item appends to the back of its bucket, so ties are resolved in FIFO
+    order, exactly as in PriorityQueue.
+
+    Only the distinct keys pass through the heap. Adding an item with a key
+    that already has a bucket, and removing an item that does not empty its
+    bucket, take O(1) time. Adding an item with a new key, and removing the
+    last item of a bucket, take O(log K) time, where K is the number of
+    distinct keys pending. This is a heap of buckets, not a calendar queue:
+    it saves heap operations when many events share a timestamp, but it is
+    not O(1) in general.
+
+    By default the key of an item is its <timestamp> attribute.
+
+    Cancelled items are handled as in PriorityQueue.
+
+    === Attributes ===
+    live: The number of items that are waiting to be removed.
+    dead: The number of cancelled items that are still stored.
+    compact_threshold: The fraction of stored entries that may be dead
+        before the queue is compacted.
+    """
+
+    live: int
+    dead: int
+    compact_threshold: float
+
+    # === Private Attributes ===
+    _key: Callable[[object], int]
+    #     Returns the integer key (priority) of an item.
+    _buckets: Dict[int, deque]
+    #     Maps each key to the entries [item, alive] with that key, in
+    #     insertion order.
+    _keys: list
+    #     The keys of _buckets, as a heapq min-heap.
+    #
+    # === Representation Invariants ===
+    # Every bucket in _buckets is non-empty.
+    # _keys holds each key of _buckets exactly once.
+    # live + dead is the total length of the buckets, and dead entries have
+    # alive set to False.
+
+    def __init__(self, key: Callable[[object], int] = attrgetter("timestamp"),
+                 compact_threshold: float = 0.5) -> None:
+        """Initialize an empty BucketQueue that orders items by <key>.
+
+        """
+        self._key = key
+        self._buckets = {}
+        self._keys = []
+        self.live = 0
+        self.dead = 0
+        self.compact_threshold = compact_threshold
+
+    def __len__(self) -> int:
+        """Return the number of items in this BucketQueue.
+
+        """
+        return self.live
+
+    def add(self, item: object) -> list:
+        """Add <item> to this BucketQueue and return its handle.
+
+        >>> bq = BucketQueue(key=len)
+        >>> bq.extend(["yellow", "blue", "red", "green"])
+        >>> [bq.remove() for _ in range(4)]
+        ['red', 'blue', 'green', 'yellow']
+        """
+        key = self._key(item)
+        bucket = self._buckets.get(key)
+        if bucket is None:
+            bucket = self._buckets[key] = deque()
+            heappush(self._keys, key)
+        entry = [item, True]
+        bucket.append(entry)
+        self.live += 1
+        return entry
+
+    def remove(self) -> object:
+        """Remove and return the next item from this BucketQueue.
+
+        Precondition: <self> should not be empty.
+
+        >>> bq = BucketQueue(key=len)
+        >>> bq.extend(["pink", "red", "blue"])
+        >>> bq.remove()
+        'red'
+        >>> bq.remove()
+        'pink'
+        """
+        buckets = self._buckets
+        while True:
+            key = self._keys[0]
+            bucket = buckets[key]
+            entry = bucket.popleft()
+            if not bucket:
+                del buckets[key]
+                heappop(self._keys)
+            if entry[_ALIVE]:
+                break
+            self.dead -= 1
+        entry[_ALIVE] = False
+        self.live -= 1
+        return entry[_ITEM]
+
+    def peek(self) -> object:
+        """Return the next item of this BucketQueue without removing it.
+
+        Precondition: <self> should not be empty.
+
+        >>> bq = BucketQueue(key=len)
+        >>> bq.extend(["pink", "red"])
+        >>> bq.peek()
+        'red'
+        """
+        buckets = self._buckets
+        while True:
+            key = self._keys[0]
+            bucket = buckets[key]
+            while bucket and not bucket[0][_ALIVE]:
+                bucket.popleft()
+                self.dead -= 1
+            if bucket:
+                return bucket[0][_ITEM]
+            del buckets[key]
+            heappop(self._keys)
+
+    def cancel(self, handle: list) -> None:
+        """Cancel the item that was added with <handle>.
+
+        >>> bq = BucketQueue(key=len)
+        >>> bq.extend(["pink", "blue"])
+        >>> bq.cancel(bq.add("red"))
+        >>> bq.live, bq.dead
+        (2, 1)
+        >>> bq.remove()
+        'pink'
+        """
+        if not handle[_ALIVE]:
+            return
+        handle[_ALIVE] = False
+        self.live -= 1
+        self.dead += 1
+        if self.live == 0:
+            self._buckets.clear()
+            self._keys.clear()
+            self.dead = 0
+        elif self.dead > self.compact_threshold * (self.live + self.dead):
+            self._compact()
+
+    def _compact(self) -> None:
+        """Rebuild the buckets without the dead entries.
+
+        """
+        buckets = {}
+        for key, bucket in self._buckets.items():
+            alive = deque(entry for entry in bucket if entry[_ALIVE])
+            if alive:
+                buckets[key] = alive
+        self._buckets = buckets
+        self._keys = list(buckets)
+        heapify(self._keys)
+        self.dead = 0
+
+    def is_empty(self) -> bool:
+        """Return True iff this BucketQueue is empty.
+
+        >>> bq = BucketQueue(key=len)
+        >>> bq.is_empty()
+        True
+        >>> bq.extend(["thing"])
+        >>> bq.is_empty()
+        False
         """
-        i = 0
-        if self.is_empty():
-            self._items.append(item)
-        while i < len(self._items) and item >= self._items[i]:
-            i += 1
-        self._items.insert(i, item)
+        return self.live == 0
 
 
 if __name__ == '__main__':
     import python_ta
-    python_ta.check_all()
+    python_ta.check_all(
+        config={'extra-imports': ['collections', 'heapq', 'itertools',
+                                  'operator', 'typing']})
@@ -1,9 +1,13 @@
 """Dispatcher for the simulation"""
 
 from __future__ import annotations
-from typing import List
+from collections import OrderedDict
+from itertools import islice
+from typing import Dict, List, Tuple
 from typing import Optional
 from driver import Driver
+from grid import DriverGrid
+from matching import min_cost_assignment
 from rider import Rider, CANCELLED
 
 
@@ -23,22 +27,33 @@ class Dispatcher:
     rider requests.
 
     Attributes:
-        driver_fleet: Dispatcher registers the driver.
-        drivers_waiting: List Drivers waiting for a rider.
-        riders_waiting: Riders waiting for a driver.
+        driver_fleet: Dispatcher registers the driver, keyed by driver id.
+        drivers_waiting: Drivers waiting for a rider, keyed by driver id,
+            in the order they started waiting.
+        riders_waiting: Riders waiting for a driver, keyed by rider id,
+            in the order they started waiting.
 
     """
-    driver_fleet: List
-    drivers_waiting: List
-    riders_waiting: List
+    driver_fleet: Dict[str, Driver]
+    drivers_waiting: Dict[str, Driver]
+    riders_waiting: Dict[str, Rider]
+
+    # === Private Attributes ===
+    _idle: DriverGrid
+    #     The drivers in drivers_waiting, indexed by location.
+    _evaluations: int
+    #     The number of travel times computed to match riders with drivers,
+    #     other than by searching _idle.
 
     def __init__(self) -> None:
         """Initialize a Dispatcher.
 
         """
-        self.driver_fleet = []
-        self.drivers_waiting = []
-        self.riders_waiting = []
+        self.driver_fleet = {}
+        self.drivers_waiting = OrderedDict()
+        self.riders_waiting = OrderedDict()
+        self._idle = DriverGrid()
+        self._evaluations = 0
 
     def __str__(self) -> str:
         """Return a string representation.
@@ -50,22 +65,28 @@ class Dispatcher:
         return "{} drivers waiting,{} riders waiting and" \
                " {} drivers registered".format(n_d, n_r, r_d)
 
+    @property
+    def evaluations(self) -> int:
+        """The number of travel times computed to choose drivers for riders.
+
+        """
+        return self._idle.evaluations + self._evaluations
+
     def request_driver(self, rider: Rider) -> Optional[Driver]:
         """Return a driver for the rider, or None if no driver is available.
 
         Add the rider to the waiting list if there is no available driver.
 
+        The driver is the waiting driver with the shortest travel time to
+        the rider; ties go to the driver that has been waiting longest. The
+        driver is removed from the waiting list.
+
         """
         if not self.drivers_waiting:
-            self.riders_waiting.append(rider)
+            self.riders_waiting[rider.id] = rider
             return None
-        nearest = self.drivers_waiting[0]
-        n_time = self.drivers_waiting[0].get_travel_time(rider.origin)
-        for driver in self.drivers_waiting:
-            if driver.get_travel_time(rider.origin) < n_time:
-                n_time = driver.get_travel_time(rider.origin)
-                nearest = driver
-        driver = nearest
+        driver = self._idle.nearest(rider.origin)
+        self._remove_waiting_driver(driver)
         return driver
 
     def request_rider(self, driver: Driver) -> Optional[Rider]:
@@ -73,15 +94,18 @@ class Dispatcher:
 
         If this is a new driver, register the driver for future rider requests.
 
+        The rider is the one that has been waiting longest, and is removed
+        from the waiting list.
+
         """
-        if driver not in self.driver_fleet:
-            self.driver_fleet.append(driver)
+        if driver.id not in self.driver_fleet:
+            self.driver_fleet[driver.id] = driver
         rider = None
         if driver.is_idle:
             if not self.riders_waiting:
-                self.drivers_waiting.append(driver)
+                self._add_waiting_driver(driver)
             else:
-                rider = self.riders_waiting[0]
+                rider = self.riders_waiting.popitem(last=False)[1]
         return rider
 
     def cancel_ride(self, rider: Rider) -> None:
@@ -91,11 +115,148 @@ class Dispatcher:
         rider.status = CANCELLED
 
         # Remove the rider from waitlist if the rider is in the waitlist
-        if rider in self.riders_waiting:
-            self.riders_waiting.remove(rider)
+        self.riders_waiting.pop(rider.id, None)
+
+    def schedule_match(self, timestamp: int) -> Optional[int]:
+        """Return the time at which waiting riders and drivers should be
+        matched in a batch, or None if no batch match needs to be scheduled.
+
+        This is called after every request made at <timestamp>. The default
+        Dispatcher matches each request immediately, so it never needs one.
+
+        """
+        return None
+
+    def match_batch(self) -> List[Tuple[Rider, Driver]]:
+        """Match waiting riders with waiting drivers, remove them from the
+        waiting lists, and return the (rider, driver) pairs.
+
+        """
+        return []
+
+    def _add_waiting_driver(self, driver: Driver) -> None:
+        """Add <driver> to the waiting list, unless it is already waiting.
+
+        """
+        if driver.id not in self.drivers_waiting:
+            self.drivers_waiting[driver.id] = driver
+            self._idle.add(driver)
+
+    def _remove_waiting_driver(self, driver: Driver) -> None:
+        """Remove <driver> from the waiting list.
+
+        Precondition: <driver> is waiting.
+        """
+        del self.drivers_waiting[driver.id]
+        self._idle.remove(driver)
+
+
+class BatchDispatcher(Dispatcher):
+    """A dispatcher that matches riders and drivers in batches.
+
+    Requests are not matched when they are made. Instead, riders and idle
+    drivers wait until the end of the current window of <window> time units,
+    and are then matched in batches of at most <batch_size> riders, oldest
+    first. Each batch is matched with the <candidates> drivers nearest to
+    each of its riders, so that the total travel time of the drivers to
+    their riders is as small as possible. This keeps the cost of a batch
+    bounded however many riders and drivers are waiting.
+
+    Attributes:
+        window: The length of a batching window, in time units.
+        batch_size: The largest number of riders matched at once.
+        candidates: The number of nearest drivers considered for each rider
+            of a batch.
 
+    """
+    window: int
+    batch_size: int
+    candidates: int
+
+    # === Private Attributes ===
+    _match_pending: bool
+    #     True iff a batch match has been scheduled and has not happened yet.
+
+    def __init__(self, window: int, batch_size: int = 32,
+                 candidates: int = 4) -> None:
+        """Initialize a BatchDispatcher with windows of <window> time units.
+
+        Precondition: window > 0, batch_size > 0 and candidates > 0.
+        """
+        super().__init__()
+        self.window = window
+        self.batch_size = batch_size
+        self.candidates = candidates
+        self._match_pending = False
+
+    def request_driver(self, rider: Rider) -> Optional[Driver]:
+        """Add the rider to the waiting list, and return None.
+
+        """
+        self.riders_waiting[rider.id] = rider
+        return None
+
+    def request_rider(self, driver: Driver) -> Optional[Rider]:
+        """Register the driver if this is a new driver, add the driver to the
+        waiting list if it is idle, and return None.
+
+        """
+        if driver.id not in self.driver_fleet:
+            self.driver_fleet[driver.id] = driver
+        if driver.is_idle:
+            self._add_waiting_driver(driver)
+        return None
+
+    def schedule_match(self, timestamp: int) -> Optional[int]:
+        """Return the end of the window containing <timestamp> if there are
+        riders and drivers waiting and no batch match is scheduled yet.
+
+        """
+        if (self._match_pending or not self.riders_waiting
+                or not self.drivers_waiting):
+            return None
+        self._match_pending = True
+        return (timestamp // self.window + 1) * self.window
+
+    def match_batch(self) -> List[Tuple[Rider, Driver]]:
+        """Match waiting riders with waiting drivers, a batch of the riders
+        that have waited longest at a time, so that the total travel time of
+        the drivers to the riders of each batch is minimal.
+
+        As many pairs as possible are matched. The pairs are returned in the
+        order the riders started waiting.
+
+        """
+        self._match_pending = False
+        pairs = []
+        while self.riders_waiting and self.drivers_waiting:
+            riders = list(islice(self.riders_waiting.values(),
+                                 self.batch_size))
+            # The nearest drivers of every rider, each once, in the order
+            # they are first found.
+            drivers = list({driver.id: driver for rider in riders
+                            for driver in self._idle.nearest_k(
+                                rider.origin, self.candidates)}.values())
+            fleet = drivers[0].fleet
+            if all(driver.fleet is fleet for driver in drivers):
+                # Compute each row of travel times in one pass over the fleet.
+                indices = [driver.index for driver in drivers]
+                costs = [fleet.travel_times(rider.origin, indices)
+                         for rider in riders]
+            else:
+                costs = [[driver.get_travel_time(rider.origin)
+                          for driver in drivers] for rider in riders]
+            self._evaluations += len(riders) * len(drivers)
+            for i, j in min_cost_assignment(costs):
+                rider, driver = riders[i], drivers[j]
+                del self.riders_waiting[rider.id]
+                self._remove_waiting_driver(driver)
+                pairs.append((rider, driver))
+        return pairs
 
 if __name__ == '__main__':
     import python_ta
 
-    python_ta.check_all(config={'extra-imports': ['typing', 'driver', 'rider']})
+    python_ta.check_all(config={'extra-imports': ['collections', 'itertools',
+                                                  'typing', 'driver', 'grid',
+                                                  'matching', 'rider']})
@@ -1,6 +1,8 @@
 """Drivers for the simulation"""
 
-from location import Location, manhattan_distance
+from typing import Optional
+from fleet import Fleet
+from location import Location
 from rider import Rider
 
 
@@ -13,23 +15,63 @@ class Driver:
         destination: Possible destination.
         is_idle: True if the driver is idle and False otherwise.
         speed: The driver's car's speed, a constant.
+        fleet: The fleet that stores the driver's location, speed and idle
+            flag.
+        index: The index of the driver in the fleet.
     """
-
+    __slots__ = ("id", "destination", "fleet", "index")
     id: str
-    location: Location
     destination: Location
-    is_idle: bool
-    speed: int
+    fleet: Fleet
+    index: int
 
-    def __init__(self, identifier: str, location: Location, speed: int) -> None:
-        """Initialize a Driver.
+    def __init__(self, identifier: str, location: Location, speed: int,
+                 fleet: Optional[Fleet] = None) -> None:
+        """Initialize a Driver, and add it to <fleet>.
 
+        If no fleet is given, the driver gets a fleet of its own.
         """
+        if fleet is None:
+            fleet = Fleet()
         self.id = identifier
-        self.location = location
-        self.speed = speed
+        self.fleet = fleet
+        self.index = fleet.add(identifier, location, speed)
         self.destination = None
-        self.is_idle = True
+
+    @property
+    def location(self) -> Location:
+        """The current location of the driver.
+
+        """
+        return self.fleet.locations[self.index]
+
+    @location.setter
+    def location(self, location: Location) -> None:
+        self.fleet.locations[self.index] = location
+        self.fleet.rows[self.index] = location.row
+        self.fleet.columns[self.index] = location.column
+
+    @property
+    def speed(self) -> int:
+        """The driver's car's speed.
+
+        """
+        return self.fleet.speeds[self.index]
+
+    @speed.setter
+    def speed(self, speed: int) -> None:
+        self.fleet.speeds[self.index] = speed
+
+    @property
+    def is_idle(self) -> bool:
+        """True if the driver is idle and False otherwise.
+
+        """
+        return self.fleet.idle[self.index] == 1
+
+    @is_idle.setter
+    def is_idle(self, is_idle: bool) -> None:
+        self.fleet.idle[self.index] = is_idle
 
     def __str__(self) -> str:
         """Return a string representation.
@@ -50,9 +92,10 @@ class Driver:
         rounded to the nearest integer.
 
         """
-        distance = manhattan_distance(self.location, destination)
-        time = distance / self.speed
-        return round(time)
+        fleet, index = self.fleet, self.index
+        distance = (abs(destination.row - fleet.rows[index])
+                    + abs(destination.column - fleet.columns[index]))
+        return round(distance / fleet.speeds[index])
 
     def start_drive(self, location: Location) -> int:
         """Start driving to the location.
@@ -99,4 +142,4 @@ if __name__ == '__main__':
     import python_ta
 
     python_ta.check_all(
-        config={'extra-imports': ['location', 'rider']})
+        config={'extra-imports': ['typing', 'fleet', 'location', 'rider']})
@@ -4,10 +4,11 @@ This file should contain all of the classes necessary to model the different
 kinds of events in the simulation.
 """
 from __future__ import annotations
-from typing import List
+from typing import Callable, Iterator, List, Optional
 from rider import Rider, WAITING, CANCELLED, SATISFIED
 from dispatcher import Dispatcher
 from driver import Driver
+from fleet import Fleet
 from location import deserialize_location
 from monitor import Monitor, RIDER, DRIVER, REQUEST, CANCEL, PICKUP, DROPOFF
 
@@ -27,11 +28,28 @@ class Event:
 
     Document any such changes carefully!
 
+    Every Event class has a small integer <kind>: EVENT_TYPES[kind] is the
+    class and HANDLERS[kind] is its do() method. The simulation loop
+    dispatches through this table. Events use __slots__, so every subclass
+    must declare the attributes it adds in its own __slots__.
+
     === Attributes ===
     timestamp: A timestamp for this event.
+    kind: The kind of this event, shared by all instances of its class.
     """
-
+    __slots__ = ("timestamp",)
     timestamp: int
+    kind = 0
+
+    def __init_subclass__(cls, **kwargs: object) -> None:
+        """Give the new Event class <cls> its own kind and register it in
+        EVENT_TYPES and HANDLERS.
+
+        """
+        super().__init_subclass__(**kwargs)
+        cls.kind = len(EVENT_TYPES)
+        EVENT_TYPES.append(cls)
+        HANDLERS.append(cls.do)
 
     def __init__(self, timestamp: int) -> None:
         """Initialize an Event with a given timestamp.
@@ -151,6 +169,11 @@ class Event:
         raise NotImplementedError("Implemented in a subclass")
 
 
+EVENT_TYPES: List[type] = [Event]
+HANDLERS: List[Callable[[Event, Dispatcher, Monitor], List[Event]]] = [
+    Event.do]
+
+
 class RiderRequest(Event):
     """A rider requests a driver.
 
@@ -158,7 +181,7 @@ class RiderRequest(Event):
     rider: The rider.
 
     """
-
+    __slots__ = ("rider",)
     rider: Rider
 
     def __init__(self, timestamp: int, rider: Rider) -> None:
@@ -188,6 +211,9 @@ class RiderRequest(Event):
                                  self.rider, driver))
         events.append(Cancellation(self.timestamp + self.rider.patience,
                                    self.rider))
+        match_time = dispatcher.schedule_match(self.timestamp)
+        if match_time is not None:
+            events.append(BatchMatch(match_time))
         return events
 
     def __str__(self) -> str:
@@ -203,7 +229,7 @@ class DriverRequest(Event):
     ==Attributes==:
     driver: The driver.
     """
-
+    __slots__ = ("driver",)
     driver: Driver
 
     def __init__(self, timestamp: int, driver: Driver) -> None:
@@ -235,6 +261,9 @@ class DriverRequest(Event):
             travel_time = self.driver.start_drive(rider.origin)
             event.\
                 append(Pickup(self.timestamp + travel_time, rider, self.driver))
+        match_time = dispatcher.schedule_match(self.timestamp)
+        if match_time is not None:
+            event.append(BatchMatch(match_time))
         return event
 
     def __str__(self) -> str:
@@ -250,6 +279,7 @@ class Cancellation(Event):
     ==Attributes==:
     rider: The rider.
     """
+    __slots__ = ("rider",)
     rider: Rider
     timestamp: int
 
@@ -287,6 +317,7 @@ class Pickup(Event):
     rider: The rider
     driver: The driver
     """
+    __slots__ = ("rider", "driver")
     timestamp: int
     rider: Rider
     driver: Driver
@@ -334,6 +365,7 @@ class Dropoff(Event):
    driver: The driver
    rider: The rider
    """
+    __slots__ = ("driver", "rider")
     timestamp: int
     driver: Driver
     rider: Rider
@@ -369,15 +401,49 @@ class Dropoff(Event):
         return events
 
 
-def create_event_list(filename: str) -> List[Event]:
-    """Return a list of Events based on raw list of events in <filename>.
+class BatchMatch(Event):
+    """The dispatcher matches all waiting riders and drivers at once.
+
+    Only dispatchers that match in batches schedule these events.
+    """
+    __slots__ = ()
+
+    def __str__(self) -> str:
+        """Return a string representation of this event.
+
+        """
+        return "{} -- Batch match".format(self.timestamp)
+
+    def do(self, dispatcher: Dispatcher, monitor: Monitor) -> List[Event]:
+        """Match the waiting riders and drivers. Each matched driver starts
+        driving to their rider.
+
+        Return a Pickup event for each match.
+
+        """
+        events = []
+        for rider, driver in dispatcher.match_batch():
+            travel_time = driver.start_drive(rider.origin)
+            events.append(Pickup(self.timestamp + travel_time, rider, driver))
+        match_time = dispatcher.schedule_match(self.timestamp)
+        if match_time is not None:
+            events.append(BatchMatch(match_time))
+        return events
+
+
+def iter_events(filename: str, fleet: Optional[Fleet] = None
+                ) -> Iterator[Event]:
+    """Yield the Events in <filename>, reading the file one line at a time.
+
+    The drivers are added to <fleet>, or to a new Fleet if none is given.
 
     Precondition: the file stored at <filename> is in the format specified
     by the assignment handout.
 
     filename: The name of a file that contains the list of events.
     """
-    events = []
+    if fleet is None:
+        fleet = Fleet()
     with open(filename, "r") as file:
         for line in file:
             line = line.strip()
@@ -399,25 +465,31 @@ def create_event_list(filename: str) -> List[Event]:
 
             if event_type == "DriverRequest":
                 location = deserialize_location(tokens[3])
-                driver = Driver(tokens[2], location, int(tokens[4]))
-                event = DriverRequest(timestamp, driver)
-                events.append(event)
+                driver = Driver(tokens[2], location, int(tokens[4]), fleet)
+                yield DriverRequest(timestamp, driver)
             elif event_type == "RiderRequest":
                 origin = deserialize_location(tokens[3])
                 destination = deserialize_location(tokens[4])
                 rider = Rider(tokens[2], int(tokens[5]), origin, destination)
                 rider.status = WAITING
-                event = RiderRequest(timestamp, rider)
-                events.append(event)
-        events.append(event)
+                yield RiderRequest(timestamp, rider)
 
-    return events
+
+def create_event_list(filename: str) -> List[Event]:
+    """Return a list of Events based on raw list of events in <filename>.
+
+    Precondition: the file stored at <filename> is in the format specified
+    by the assignment handout.
+
+    filename: The name of a file that contains the list of events.
+    """
+    return list(iter_events(filename))
 
 
 if __name__ == '__main__':
     import python_ta
     python_ta.check_all(
         config={
-            'allowed-io': ['create_event_list'],
-            'extra-imports': ['rider', 'dispatcher', 'driver',
+            'allowed-io': ['iter_events'],
+            'extra-imports': ['rider', 'dispatcher', 'driver', 'fleet',
                               'location', 'monitor']})
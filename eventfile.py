@@ -0,0 +1,469 @@
+"""A binary, column-oriented format for event files
+
+Parsing the text format of events.txt means stripping, splitting and
+converting every token of every line. A binary event file stores the same
+events column by column, as fixed-width integers, so reading it is a matter
+of memory-mapping the file and viewing each column in place. Large text
+event files can also be parsed into columns on several cores by parse_file.
+
+The same layout can be put in shared memory with EventColumns.share(), so
+that parallel runs read one copy of the parsed events instead of each
+parsing and holding its own.
+
+A binary event file holds, in this order and in the byte order of the
+machine that wrote it:
+
+    header        MAGIC, VERSION, BYTE_ORDER_MARK, the number of events and
+                  the length of the name table in bytes
+    timestamps    a signed 64-bit integer per event
+    ids           an unsigned 32-bit index into the name table per event
+    origin_rows, origin_columns, destination_rows, destination_columns,
+    values        a signed 32-bit integer per event, for each column
+    kinds         a byte per event: DRIVER_REQUEST or RIDER_REQUEST
+    names         the id of every driver and rider, in UTF-8, separated by
+                  newlines
+
+A driver's location is stored as its origin and its speed as its value; a
+rider's patience is stored as its value.
+
+Convert a text event file from the command line with
+
+    python eventfile.py events.txt events.bin
+"""
+from __future__ import annotations
+import argparse
+import mmap
+import os
+import struct
+from array import array
+from concurrent.futures import ProcessPoolExecutor
+from itertools import repeat
+from multiprocessing.shared_memory import SharedMemory
+from typing import Dict, Iterable, Iterator, List, Optional, Tuple, Union
+from driver import Driver
+from event import DriverRequest, Event, RiderRequest
+from fleet import Fleet
+from location import Location
+from rider import Rider, WAITING
+
+MAGIC = b"EVTC"
+VERSION = 1
+BYTE_ORDER_MARK = 0xFEFF
+
+# The kind of each event, as stored in the kinds column.
+DRIVER_REQUEST = 0
+RIDER_REQUEST = 1
+
+# The name and array typecode of each column, in the order of the file.
+COLUMNS = [("timestamps", "q"), ("ids", "I"), ("origin_rows", "i"),
+           ("origin_columns", "i"), ("destination_rows", "i"),
+           ("destination_columns", "i"), ("values", "i"), ("kinds", "B")]
+
+_HEADER = struct.Struct("=4sHHQQ")
+
+# The size in bytes of the chunks parse_file hands to each worker.
+CHUNK_SIZE = 1 << 22
+
+
+class EventColumns:
+    """The initial events of a simulation, stored column by column.
+
+    Event i is described by entry i of every column. The columns are arrays
+    when the events are parsed or appended, and memoryviews when they are
+    opened from a binary event file or attached from shared memory, in
+    which case they stay valid until close() is called.
+
+    === Attributes ===
+    names: The id of every driver and rider, indexed by the ids column.
+    timestamps: The timestamp of each event.
+    ids: The index in <names> of the driver or rider of each event.
+    origin_rows: The row of each driver's location or rider's origin.
+    origin_columns: The column of each driver's location or rider's origin.
+    destination_rows: The row of each rider's destination, or 0.
+    destination_columns: The column of each rider's destination, or 0.
+    values: The speed of each driver or the patience of each rider.
+    kinds: DRIVER_REQUEST or RIDER_REQUEST for each event.
+    """
+
+    names: List[str]
+    timestamps: Iterable[int]
+    ids: Iterable[int]
+    origin_rows: Iterable[int]
+    origin_columns: Iterable[int]
+    destination_rows: Iterable[int]
+    destination_columns: Iterable[int]
+    values: Iterable[int]
+    kinds: Iterable[int]
+
+    # === Private Attributes ===
+    _index: Dict[str, int]
+    #     Maps each name to its index in names.
+    _mapped: Optional[Union[mmap.mmap, SharedMemory]]
+    #     The memory-mapped file or shared memory the columns are views
+    #     onto, or None.
+
+    def __init__(self) -> None:
+        """Initialize an empty EventColumns.
+
+        """
+        self.names = []
+        for name, typecode in COLUMNS:
+            setattr(self, name, array(typecode))
+        self._index = {}
+        self._mapped = None
+
+    def __len__(self) -> int:
+        """Return the number of events.
+
+        """
+        return len(self.timestamps)
+
+    def __enter__(self) -> EventColumns:
+        """Return these columns, to be closed at the end of a with block.
+
+        """
+        return self
+
+    def __exit__(self, *exc_info: object) -> None:
+        """Close these columns.
+
+        """
+        self.close()
+
+    def append(self, timestamp: int, kind: int, name: str,
+               origin: Tuple[int, int], destination: Tuple[int, int],
+               value: int) -> None:
+        """Append an event to these columns.
+
+        Precondition: these columns were not opened from a binary file.
+
+        >>> columns = EventColumns()
+        >>> columns.append(1, DRIVER_REQUEST, "Atom", (1, 1), (0, 0), 2)
+        >>> columns.append(3, RIDER_REQUEST, "Bam", (1, 5), (4, 2), 10)
+        >>> len(columns), columns.names, list(columns.values)
+        (2, ['Atom', 'Bam'], [2, 10])
+        """
+        self.timestamps.append(timestamp)
+        self.kinds.append(kind)
+        self.ids.append(self._name_index(name))
+        self.origin_rows.append(origin[0])
+        self.origin_columns.append(origin[1])
+        self.destination_rows.append(destination[0])
+        self.destination_columns.append(destination[1])
+        self.values.append(value)
+
+    def extend(self, other: EventColumns) -> None:
+        """Append the events in <other> to these columns, in order.
+
+        Precondition: these columns were not opened from a binary file.
+
+        >>> columns = parse_lines(["1 DriverRequest Atom 1,1 2"])
+        >>> columns.extend(parse_lines(["3 RiderRequest Bam 1,5 4,2 10",
+        ...                             "4 DriverRequest Atom 1,1 2"]))
+        >>> columns.names, list(columns.ids)
+        (['Atom', 'Bam'], [0, 1, 0])
+        """
+        indices = [self._name_index(name) for name in other.names]
+        self.ids.extend(indices[index] for index in other.ids)
+        for name, _ in COLUMNS:
+            if name != "ids":
+                getattr(self, name).extend(getattr(other, name))
+
+    def _name_index(self, name: str) -> int:
+        """Return the index of <name> in names, adding it if it is new.
+
+        """
+        index = self._index.get(name)
+        if index is None:
+            index = self._index[name] = len(self.names)
+            self.names.append(name)
+        return index
+
+    def __getstate__(self) -> Tuple[List[str], List[array]]:
+        """Return the names and each column as an array, for pickling. The
+        columns pickle as raw bytes rather than as one object per event.
+
+        """
+        columns = []
+        for name, typecode in COLUMNS:
+            column = getattr(self, name)
+            if not isinstance(column, array):
+                column = array(typecode, column.tobytes())
+            columns.append(column)
+        return self.names, columns
+
+    def __setstate__(self, state: Tuple[List[str], List[array]]) -> None:
+        """Restore columns pickled by __getstate__.
+
+        """
+        self.names, columns = state
+        for (name, _), column in zip(COLUMNS, columns):
+            setattr(self, name, column)
+        self._index = {name: i for i, name in enumerate(self.names)}
+        self._mapped = None
+
+    def events(self, fleet: Optional[Fleet] = None) -> Iterator[Event]:
+        """Yield the events in these columns, in order, as iter_events would
+        for the equivalent text file.
+
+        The drivers are added to <fleet>, or to a new Fleet if none is given.
+        Equal locations are the same Location object.
+
+        >>> columns = EventColumns()
+        >>> columns.append(1, DRIVER_REQUEST, "Atom", (1, 1), (0, 0), 2)
+        >>> columns.append(3, RIDER_REQUEST, "Bam", (1, 5), (4, 2), 10)
+        >>> for event in columns.events():
+        ...     print(event)
+        1 -- Driver Atom: Request a rider
+        3 -- Rider Bam: Request a driver
+        """
+        if fleet is None:
+            fleet = Fleet()
+        names = self.names
+        locations = {}
+        for timestamp, kind, index, row, column, to_row, to_column, value \
+                in zip(self.timestamps, self.kinds, self.ids,
+                       self.origin_rows, self.origin_columns,
+                       self.destination_rows, self.destination_columns,
+                       self.values):
+            origin = locations.get((row, column))
+            if origin is None:
+                origin = locations[(row, column)] = Location(row, column)
+            if kind == DRIVER_REQUEST:
+                driver = Driver(names[index], origin, value, fleet)
+                yield DriverRequest(timestamp, driver)
+            elif kind == RIDER_REQUEST:
+                destination = locations.get((to_row, to_column))
+                if destination is None:
+                    destination = locations[(to_row, to_column)] = \
+                        Location(to_row, to_column)
+                rider = Rider(names[index], value, origin, destination)
+                rider.status = WAITING
+                yield RiderRequest(timestamp, rider)
+
+    def save(self, filename: str) -> None:
+        """Write these columns to <filename> as a binary event file.
+
+        """
+        with open(filename, "wb") as file:
+            for part in self._encode():
+                file.write(part)
+
+    def share(self) -> SharedMemory:
+        """Copy these columns into a new block of shared memory, in the
+        format of a binary event file, and return the block.
+
+        Other processes can read the columns in place with
+        attach_event_columns(block.name). The caller must close and unlink
+        the block once they are done.
+        """
+        parts = [memoryview(part).cast("B") for part in self._encode()]
+        block = SharedMemory(create=True,
+                             size=max(1, sum(len(part) for part in parts)))
+        offset = 0
+        for part in parts:
+            block.buf[offset:offset + len(part)] = part
+            offset += len(part)
+        return block
+
+    def _encode(self) -> List[Union[bytes, array, memoryview]]:
+        """Return the parts of the binary event file of these columns, in
+        order.
+
+        """
+        names = "\n".join(self.names).encode("utf-8")
+        header = _HEADER.pack(MAGIC, VERSION, BYTE_ORDER_MARK, len(self),
+                              len(names))
+        return [header] + [getattr(self, name) for name, _ in COLUMNS] + \
+            [names]
+
+    def close(self) -> None:
+        """Release the file or shared memory these columns were opened
+        from, if any, and leave them empty.
+
+        """
+        if self._mapped is None:
+            return
+        for name, _ in COLUMNS:
+            getattr(self, name).release()
+        self._mapped.close()
+        self.__init__()
+
+
+def open_event_file(filename: str) -> EventColumns:
+    """Return the columns of the binary event file <filename>, as views
+    onto the memory-mapped file.
+
+    Raise ValueError if <filename> is not a binary event file this version
+    can read, or was written on a machine with a different byte order.
+    """
+    with open(filename, "rb") as file:
+        mapped = mmap.mmap(file.fileno(), 0, access=mmap.ACCESS_READ)
+    try:
+        return _view_columns(mapped, memoryview(mapped), filename)
+    except ValueError:
+        mapped.close()
+        raise
+
+
+def attach_event_columns(name: str) -> EventColumns:
+    """Return the columns in the block of shared memory called <name>,
+    created by EventColumns.share(), as read-only views onto the block.
+
+    Attaching does not copy the columns, so every process that attaches
+    shares one copy of them.
+    """
+    block = SharedMemory(name)
+    try:
+        return _view_columns(block, block.buf.toreadonly(), name)
+    except ValueError:
+        block.close()
+        raise
+
+
+def _view_columns(source: Union[mmap.mmap, SharedMemory], buffer: memoryview,
+                  name: str) -> EventColumns:
+    """Return the columns of the binary event file in <buffer>, the memory
+    of <source>, as views onto <buffer>. <name> names the source in errors.
+
+    """
+    if len(buffer) < _HEADER.size:
+        buffer.release()
+        raise ValueError("{} is not a binary event file".format(name))
+    magic, version, mark, count, names_length = _HEADER.unpack_from(buffer)
+    if magic != MAGIC or version != VERSION or mark != BYTE_ORDER_MARK:
+        buffer.release()
+        raise ValueError("{} is not a binary event file of version {} "
+                         "in this machine's byte order"
+                         .format(name, VERSION))
+
+    columns = EventColumns()
+    offset = _HEADER.size
+    for column, typecode in COLUMNS:
+        size = count * array(typecode).itemsize
+        setattr(columns, column, buffer[offset:offset + size].cast(typecode))
+        offset += size
+    names = bytes(buffer[offset:offset + names_length]).decode("utf-8")
+    buffer.release()
+    columns.names = names.split("\n") if names else []
+    columns._mapped = source
+    return columns
+
+
+def parse_lines(lines: Iterable[str],
+                columns: Optional[EventColumns] = None) -> EventColumns:
+    """Parse the text event file lines in <lines> and append their events to
+    <columns>, or to new columns if none are given. Return the columns.
+
+    Blank lines, comments and unknown kinds of event are skipped, as they
+    are by iter_events.
+
+    >>> columns = parse_lines(["# drivers", "1 DriverRequest Atom 1,1 2",
+    ...                        "", "3 RiderRequest Bam 1,5 4,2 10"])
+    >>> list(columns.timestamps), list(columns.kinds)
+    ([1, 3], [0, 1])
+    """
+    if columns is None:
+        columns = EventColumns()
+    for line in lines:
+        tokens = line.split()
+        if not tokens or tokens[0].startswith("#"):
+            continue
+        event_type = tokens[1]
+        if event_type == "DriverRequest":
+            row, column = tokens[3].split(",")
+            columns.append(int(tokens[0]), DRIVER_REQUEST, tokens[2],
+                           (int(row), int(column)), (0, 0), int(tokens[4]))
+        elif event_type == "RiderRequest":
+            row, column = tokens[3].split(",")
+            to_row, to_column = tokens[4].split(",")
+            columns.append(int(tokens[0]), RIDER_REQUEST, tokens[2],
+                           (int(row), int(column)),
+                           (int(to_row), int(to_column)), int(tokens[5]))
+    return columns
+
+
+def parse_file(filename: str, processes: Optional[int] = None,
+               chunk_size: int = CHUNK_SIZE) -> EventColumns:
+    """Parse the text event file <filename> into columns, using a pool of
+    <processes> worker processes (by default, one per core).
+
+    The file is split into chunks of about <chunk_size> bytes that end on
+    line boundaries, and each chunk is parsed by parse_lines in a worker.
+    The chunks come back as columns and are merged in the order of the
+    file, so the events are in exactly the order that parse_lines would
+    give, and events with equal timestamps keep their order in the file.
+    """
+    bounds = _chunk_bounds(filename, chunk_size)
+    if processes == 1 or len(bounds) <= 1:
+        chunks = (_parse_chunk(filename, start, end) for start, end in bounds)
+        return _merge(chunks)
+    with ProcessPoolExecutor(processes) as executor:
+        return _merge(executor.map(_parse_chunk, repeat(filename),
+                                   *zip(*bounds)))
+
+
+def _chunk_bounds(filename: str, chunk_size: int) -> List[Tuple[int, int]]:
+    """Return the start and end offsets of the chunks of about <chunk_size>
+    bytes that <filename> is split into, each ending on a line boundary.
+
+    """
+    size = os.path.getsize(filename)
+    bounds = []
+    start = 0
+    with open(filename, "rb") as file:
+        while start < size:
+            file.seek(start + chunk_size)
+            file.readline()
+            end = min(file.tell(), size)
+            bounds.append((start, end))
+            start = end
+    return bounds
+
+
+def _parse_chunk(filename: str, start: int, end: int) -> EventColumns:
+    """Return the columns of the events in bytes <start> to <end> of the
+    text event file <filename>.
+
+    """
+    with open(filename, "rb") as file:
+        file.seek(start)
+        data = file.read(end - start)
+    return parse_lines(data.decode("utf-8").splitlines())
+
+
+def _merge(chunks: Iterable[EventColumns]) -> EventColumns:
+    """Return the events in <chunks> as one set of columns, in order.
+
+    """
+    merged = EventColumns()
+    for chunk in chunks:
+        merged.extend(chunk)
+    return merged
+
+
+def convert_event_file(text_filename: str, binary_filename: str) -> int:
+    """Convert the text event file <text_filename> into the binary event
+    file <binary_filename>, and return the number of events.
+
+    """
+    columns = parse_file(text_filename)
+    columns.save(binary_filename)
+    return len(columns)
+
+
+def main() -> None:
+    """Convert the text event file named on the command line.
+
+    """
+    parser = argparse.ArgumentParser(
+        description="Convert a text event file into a binary event file.")
+    parser.add_argument("text", help="the text event file to read")
+    parser.add_argument("binary", help="the binary event file to write")
+    args = parser.parse_args()
+    count = convert_event_file(args.text, args.binary)
+    print("wrote {} events to {}".format(count, args.binary))
+
+
+if __name__ == "__main__":
+    main()
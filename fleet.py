@@ -0,0 +1,99 @@
+"""Column storage for a fleet of drivers"""
+
+from __future__ import annotations
+from array import array
+from typing import List, Optional, Sequence
+from location import Location
+
+
+class Fleet:
+    """The state of a fleet of drivers, stored column by column.
+
+    Each driver is a row of the fleet, identified by its index. Keeping the
+    locations, speeds and idle flags of all the drivers in contiguous typed
+    arrays lets fleet-wide queries run over the columns directly instead of
+    going through one Python object per driver.
+
+    Driver objects are views onto a row of a Fleet. Each driver's Location
+    object is kept as well as its row and column, so that reading a driver's
+    location returns the same (interned) object that was stored.
+
+    === Attributes ===
+    ids: The identifier of each driver.
+    locations: The location of each driver.
+    rows: The row of each driver's location.
+    columns: The column of each driver's location.
+    speeds: The speed of each driver.
+    idle: 1 for each driver that is idle, and 0 otherwise.
+    """
+
+    ids: List[str]
+    locations: List[Location]
+    rows: array
+    columns: array
+    speeds: array
+    idle: bytearray
+
+    def __init__(self) -> None:
+        """Initialize an empty Fleet.
+
+        """
+        self.ids = []
+        self.locations = []
+        self.rows = array("q")
+        self.columns = array("q")
+        self.speeds = array("q")
+        self.idle = bytearray()
+
+    def __len__(self) -> int:
+        """Return the number of drivers in this Fleet.
+
+        """
+        return len(self.ids)
+
+    def add(self, identifier: str, location: Location, speed: int) -> int:
+        """Add an idle driver to this Fleet and return its index.
+
+        >>> fleet = Fleet()
+        >>> fleet.add("Amaranth", Location(1, 1), 1)
+        0
+        >>> fleet.add("Bergamot", Location(1, 2), 1)
+        1
+        """
+        self.ids.append(identifier)
+        self.locations.append(location)
+        self.rows.append(location.row)
+        self.columns.append(location.column)
+        self.speeds.append(speed)
+        self.idle.append(1)
+        return len(self.ids) - 1
+
+    def travel_times(self, origin: Location,
+                     indices: Optional[Sequence[int]] = None) -> List[int]:
+        """Return the time it would take each driver to arrive at <origin>,
+        rounded to the nearest integer, as Driver.get_travel_time does.
+
+        If <indices> is given, return the travel times of just those drivers,
+        in that order.
+
+        >>> fleet = Fleet()
+        >>> for i, (row, col) in enumerate([(1, 1), (3, 1), (5, 2)]):
+        ...     _ = fleet.add(str(i), Location(row, col), 2)
+        >>> fleet.travel_times(Location(4, 2))
+        [2, 1, 0]
+        >>> fleet.travel_times(Location(4, 2), [2, 0])
+        [0, 2]
+        """
+        row, col = origin.row, origin.column
+        if indices is None:
+            return [round((abs(r - row) + abs(c - col)) / s)
+                    for r, c, s in zip(self.rows, self.columns, self.speeds)]
+        rows, columns, speeds = self.rows, self.columns, self.speeds
+        return [round((abs(rows[i] - row) + abs(columns[i] - col)) / speeds[i])
+                for i in indices]
+
+
+if __name__ == '__main__':
+    import python_ta
+    python_ta.check_all(config={'extra-imports': ['array', 'typing',
+                                                  'location']})
@@ -0,0 +1,274 @@
+"""A spatial index of drivers for the simulation"""
+
+from __future__ import annotations
+from bisect import insort
+from typing import Dict, Iterator, List, Optional, Tuple
+from driver import Driver
+from location import Location
+
+
+class DriverGrid:
+    """An index of drivers by location, for finding the driver with the
+    shortest travel time to a location.
+
+    The grid is divided into square cells of <cell_size> blocks, and each
+    cell keeps the drivers whose location falls inside it. A query looks at
+    the cell containing the destination, then at the rings of cells around
+    it, and stops as soon as no driver in a farther ring could possibly
+    arrive sooner than the best driver found so far.
+
+    Drivers are ranked exactly as by a linear scan of the drivers in the
+    order they were added: by travel time, then by who was added first.
+
+    The location of a driver must not change while it is in the grid.
+
+    === Attributes ===
+    cell_size: The width and height of a cell, in blocks.
+    evaluations: The number of travel times computed by searches.
+    """
+
+    cell_size: int
+    evaluations: int
+
+    # === Private Attributes ===
+    _cells: Dict[Tuple[int, int], Dict[str, Driver]]
+    #     Maps a cell to the drivers in it, keyed by driver id.
+    _cell_of: Dict[str, Tuple[int, int]]
+    #     Maps the id of each driver in the grid to its cell.
+    _order: Dict[str, int]
+    #     Maps the id of each driver in the grid to the order in which it was
+    #     added, used to break ties.
+    _added: int
+    #     The number of drivers ever added.
+    _speeds: Dict[int, int]
+    #     Maps each speed to the number of drivers in the grid with it.
+    _max_speed: int
+    #     The largest speed in _speeds, or 0 if the grid is empty.
+    _bounds: Optional[Tuple[int, int, int, int]]
+    #     The smallest and largest row and column (in that order) of any cell
+    #     that has ever been occupied, or None if no driver was ever added.
+    #
+    # === Representation Invariants ===
+    # _cells has no empty cells.
+
+    def __init__(self, cell_size: int = 8) -> None:
+        """Initialize an empty DriverGrid.
+
+        """
+        self.cell_size = cell_size
+        self._cells = {}
+        self._cell_of = {}
+        self._order = {}
+        self._added = 0
+        self._speeds = {}
+        self._max_speed = 0
+        self.evaluations = 0
+        self._bounds = None
+
+    def __len__(self) -> int:
+        """Return the number of drivers in this grid.
+
+        """
+        return len(self._cell_of)
+
+    def __contains__(self, driver: Driver) -> bool:
+        """Return True iff <driver> is in this grid.
+
+        """
+        return driver.id in self._cell_of
+
+    def _cell(self, location: Location) -> Tuple[int, int]:
+        """Return the cell that contains <location>.
+
+        """
+        return (location.row // self.cell_size,
+                location.column // self.cell_size)
+
+    def add(self, driver: Driver) -> None:
+        """Add <driver> to this grid, after all the drivers already in it.
+
+        Precondition: <driver> is not in this grid.
+        """
+        cell = self._cell(driver.location)
+        self._cells.setdefault(cell, {})[driver.id] = driver
+        self._cell_of[driver.id] = cell
+        self._order[driver.id] = self._added
+        self._added += 1
+
+        self._speeds[driver.speed] = self._speeds.get(driver.speed, 0) + 1
+        self._max_speed = max(self._max_speed, driver.speed)
+
+        row, col = cell
+        if self._bounds is None:
+            self._bounds = (row, row, col, col)
+        else:
+            min_row, max_row, min_col, max_col = self._bounds
+            self._bounds = (min(min_row, row), max(max_row, row),
+                            min(min_col, col), max(max_col, col))
+
+    def remove(self, driver: Driver) -> None:
+        """Remove <driver> from this grid.
+
+        Precondition: <driver> is in this grid.
+        """
+        cell = self._cell_of.pop(driver.id)
+        del self._order[driver.id]
+        drivers = self._cells[cell]
+        del drivers[driver.id]
+        if not drivers:
+            del self._cells[cell]
+
+        self._speeds[driver.speed] -= 1
+        if self._speeds[driver.speed] == 0:
+            del self._speeds[driver.speed]
+            if driver.speed == self._max_speed:
+                self._max_speed = max(self._speeds, default=0)
+
+    def nearest(self, destination: Location) -> Optional[Driver]:
+        """Return the driver with the shortest travel time to <destination>,
+        or None if this grid is empty.
+
+        If several drivers have the shortest travel time, return the one that
+        was added first.
+
+        With cells of 2 blocks, b and c both arrive at (0, 0) in 1, so b wins
+        the tie although c is in a nearer ring. Once both are gone, the fast
+        driver d, three rings out, still beats the slow driver a, two rings
+        out, and the search stops two rings later, having computed the
+        travel times of only a and d, not of the drivers far away in row 40.
+        Each answer is the one a linear scan gives.
+
+        >>> drivers = [Driver("a", Location(5, 0), 1),
+        ...            Driver("b", Location(0, 3), 3),
+        ...            Driver("c", Location(1, 1), 2),
+        ...            Driver("d", Location(0, 7), 3)]
+        >>> drivers += [Driver(str(i), Location(40, 2 * i), 1)
+        ...             for i in range(30)]
+        >>> grid = DriverGrid(cell_size=2)
+        >>> for driver in drivers:
+        ...     grid.add(driver)
+        >>> origin = Location(0, 0)
+        >>> def scan() -> Driver:
+        ...     return min([driver for driver in drivers if driver in grid],
+        ...                key=lambda driver: driver.get_travel_time(origin))
+        >>> grid.nearest(origin).id, scan().id
+        ('b', 'b')
+        >>> grid.remove(drivers[1])
+        >>> grid.nearest(origin).id, scan().id
+        ('c', 'c')
+        >>> grid.remove(drivers[2])
+        >>> grid.nearest(origin).id, scan().id
+        ('d', 'd')
+        >>> before = grid.evaluations
+        >>> grid.nearest(origin).id
+        'd'
+        >>> grid.evaluations - before
+        2
+        """
+        found = self._search(destination, 1)
+        return found[0][1] if found else None
+
+    def nearest_k(self, destination: Location, k: int) -> List[Driver]:
+        """Return the <k> drivers with the shortest travel times to
+        <destination>, nearest first, or all the drivers if there are fewer.
+
+        Drivers with the same travel time are ordered by who was added first,
+        as by nearest().
+
+        >>> drivers = [Driver("a", Location(5, 0), 1),
+        ...            Driver("b", Location(0, 3), 3),
+        ...            Driver("c", Location(1, 1), 2),
+        ...            Driver("d", Location(0, 7), 3)]
+        >>> drivers += [Driver(str(i), Location(40, 2 * i), 1)
+        ...             for i in range(30)]
+        >>> grid = DriverGrid(cell_size=2)
+        >>> for driver in drivers:
+        ...     grid.add(driver)
+        >>> origin = Location(0, 0)
+        >>> [driver.id for driver in grid.nearest_k(origin, 3)]
+        ['b', 'c', 'd']
+        >>> ranked = sorted(drivers,
+        ...                 key=lambda driver: driver.get_travel_time(origin))
+        >>> grid.nearest_k(origin, 3) == ranked[:3]
+        True
+        >>> len(grid.nearest_k(origin, 100))
+        34
+        """
+        return [driver for _, driver in self._search(destination, k)]
+
+    def _search(self, destination: Location, k: int
+                ) -> List[Tuple[Tuple[int, int], Driver]]:
+        """Return the <k> drivers with the shortest travel times to
+        <destination>, nearest first, each with its (travel time, order) key.
+
+        Precondition: k >= 1.
+        """
+        if not self._cell_of:
+            return []
+        row, col = self._cell(destination)
+        min_row, max_row, min_col, max_col = self._bounds
+        last_ring = max(row - min_row, max_row - row,
+                        col - min_col, max_col - col)
+
+        # The best drivers found so far, sorted by key, and the key of the
+        # kth best once k have been found.
+        best = []
+        worst = None
+        evaluations = 0
+        for ring in range(last_ring + 1):
+            if worst is not None and ring > 0:
+                # Every location in this ring is at least this far away.
+                distance = (ring - 1) * self.cell_size + 1
+                if round(distance / self._max_speed) > worst[0]:
+                    break
+            if 8 * ring > len(self._cells):
+                # The remaining rings have more cells than are occupied, so
+                # visit the occupied ones directly and finish.
+                cells = [drivers for (r, c), drivers in self._cells.items()
+                         if max(abs(r - row), abs(c - col)) >= ring]
+            else:
+                cells = self._ring(row, col, ring)
+            for drivers in cells:
+                evaluations += len(drivers)
+                for driver in drivers.values():
+                    key = (driver.get_travel_time(destination),
+                           self._order[driver.id])
+                    if worst is None or key < worst:
+                        # Keys are unique, so drivers are never compared.
+                        insort(best, (key, driver))
+                        if len(best) > k:
+                            best.pop()
+                        if len(best) == k:
+                            worst = best[-1][0]
+            if 8 * ring > len(self._cells):
+                break
+        self.evaluations += evaluations
+        return best
+
+    def _ring(self, row: int, col: int, ring: int
+              ) -> Iterator[Dict[str, Driver]]:
+        """Yield the drivers of each occupied cell whose Chebyshev distance
+        from the cell (<row>, <col>) is <ring>.
+
+        """
+        cells = self._cells
+        if ring == 0:
+            if (row, col) in cells:
+                yield cells[(row, col)]
+            return
+        for c in range(col - ring, col + ring + 1):
+            for r in (row - ring, row + ring):
+                if (r, c) in cells:
+                    yield cells[(r, c)]
+        for r in range(row - ring + 1, row + ring):
+            for c in (col - ring, col + ring):
+                if (r, c) in cells:
+                    yield cells[(r, c)]
+
+
+if __name__ == '__main__':
+    import python_ta
+
+    python_ta.check_all(
+        config={'extra-imports': ['bisect', 'typing', 'driver',
+                                  'location']})
@@ -0,0 +1,172 @@
+"""Instrumentation of simulation runs
+
+An Instrumentation passed to a Simulation records, while it runs, how many
+events of each kind were done and how long their do() methods took, samples
+the length of the event queue and of the dispatcher's waiting lists over
+simulated time, and counts the travel times computed to match riders with
+drivers. Its statistics are added to the report of the run.
+
+A Simulation without one does no extra work: the handlers of the events are
+only wrapped when an Instrumentation is given.
+"""
+from __future__ import annotations
+from array import array
+from time import perf_counter
+from typing import Callable, Dict, List
+from container import Container
+from dispatcher import Dispatcher
+from event import EVENT_TYPES, Event, Pickup
+from monitor import Monitor
+
+Handler = Callable[[Event, Dispatcher, Monitor], List[Event]]
+
+
+class Instrumentation:
+    """The statistics of a simulation run, recorded as it runs.
+
+    The gauges are sampled once every <interval> units of simulated time,
+    just before the first event due at or after each sample time. When no
+    event is due for several intervals, only the last of them is sampled,
+    as the gauges cannot change in between.
+
+    Only the travel times the dispatcher computes to choose drivers for
+    riders are counted: those of the drivers a request_driver search looks
+    at, or every entry of a batch's cost matrix. Those of the drives to
+    pickups and drop-offs are not.
+
+    === Attributes ===
+    interval: The simulated time between samples of the gauges.
+    counts: The number of events of each kind done, indexed by kind.
+    seconds: The total time taken by the do() method of the events of each
+        kind, indexed by kind.
+    sample_times: The simulated time of each sample.
+    queue_depths: The number of events in the event queue at each sample.
+    drivers_waiting: The number of drivers waiting at each sample.
+    riders_waiting: The number of riders waiting at each sample.
+    evaluations: The number of travel times computed to match riders with
+        drivers during the run.
+    """
+
+    interval: int
+    counts: List[int]
+    seconds: List[float]
+    sample_times: array
+    queue_depths: array
+    drivers_waiting: array
+    riders_waiting: array
+    evaluations: int
+
+    # === Private Attributes ===
+    _next_sample: int
+    #     The simulated time of the next sample.
+    _dispatcher: Dispatcher
+    #     The dispatcher of the run.
+    _evaluations: int
+    #     The dispatcher's count of travel times computed when the run
+    #     started.
+
+    def __init__(self, interval: int = 10) -> None:
+        """Initialize an Instrumentation that samples its gauges every
+        <interval> units of simulated time.
+
+        Precondition: interval >= 1.
+        """
+        self.interval = interval
+        self.counts = []
+        self.seconds = []
+        self.sample_times = array("q")
+        self.queue_depths = array("q")
+        self.drivers_waiting = array("q")
+        self.riders_waiting = array("q")
+        self.evaluations = 0
+        self._next_sample = 0
+        self._dispatcher = None
+        self._evaluations = 0
+
+    def start(self, queue: Container, dispatcher: Dispatcher,
+              handlers: List[Handler]) -> List[Handler]:
+        """Start recording a run with <queue> and <dispatcher>, and return
+        <handlers> wrapped to be counted, timed and to sample the gauges.
+
+        """
+        self.counts = [0] * len(handlers)
+        self.seconds = [0.0] * len(handlers)
+        self.sample_times = array("q")
+        self.queue_depths = array("q")
+        self.drivers_waiting = array("q")
+        self.riders_waiting = array("q")
+        self.evaluations = 0
+        self._next_sample = 0
+        self._dispatcher = dispatcher
+        self._evaluations = dispatcher.evaluations
+        counts, seconds, clock = self.counts, self.seconds, perf_counter
+
+        def sample(timestamp: int) -> None:
+            time = timestamp - timestamp % self.interval
+            self.sample_times.append(time)
+            self.queue_depths.append(len(queue))
+            self.drivers_waiting.append(len(dispatcher.drivers_waiting))
+            self.riders_waiting.append(len(dispatcher.riders_waiting))
+            self._next_sample = time + self.interval
+
+        def wrap(kind: int, handler: Handler) -> Handler:
+            def timed(event: Event, dispatcher: Dispatcher,
+                      monitor: Monitor) -> List[Event]:
+                if event.timestamp >= self._next_sample:
+                    sample(event.timestamp)
+                start = clock()
+                new = handler(event, dispatcher, monitor)
+                seconds[kind] += clock() - start
+                counts[kind] += 1
+                return new
+            return timed
+
+        return [wrap(kind, handler) for kind, handler in enumerate(handlers)]
+
+    def stop(self) -> None:
+        """Stop recording the run.
+
+        """
+        self.evaluations = self._dispatcher.evaluations - self._evaluations
+
+    @property
+    def matches(self) -> int:
+        """The number of riders matched with a driver, which is the number
+        of Pickup events done.
+
+        """
+        return sum(count for cls, count in zip(EVENT_TYPES, self.counts)
+                   if issubclass(cls, Pickup))
+
+    def report(self) -> Dict[str, float]:
+        """Return the statistics of the run: for each kind of event done,
+        its count and the total time of its do() method in seconds; the mean
+        and maximum of each gauge; and the travel times computed to match
+        riders with drivers, in total and per match.
+
+        """
+        report = {}
+        for cls, count, seconds in zip(EVENT_TYPES, self.counts,
+                                       self.seconds):
+            if count:
+                report["events_" + cls.__name__] = count
+                report["do_seconds_" + cls.__name__] = seconds
+        for name, column in [("queue_depth", self.queue_depths),
+                             ("drivers_waiting", self.drivers_waiting),
+                             ("riders_waiting", self.riders_waiting)]:
+            if column:
+                report[name + "_mean"] = sum(column) / len(column)
+                report[name + "_max"] = max(column)
+        report["travel_time_evaluations"] = self.evaluations
+        if self.matches:
+            report["travel_time_evaluations_per_match"] = \
+                self.evaluations / self.matches
+        return report
+
+
+if __name__ == '__main__':
+    import python_ta
+    python_ta.check_all(
+        config={
+            'extra-imports': ['array', 'time', 'typing', 'container',
+                              'dispatcher', 'event', 'monitor']})
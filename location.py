@@ -1,11 +1,18 @@
 """Locations for the simulation"""
 
 from __future__ import annotations
+from typing import Dict, Tuple
+
+# The most locations deserialize_location keeps interned at once.
+INTERN_LIMIT = 1 << 20
 
 
 class Location:
     """A two-dimensional location.
 
+    Locations are immutable and hashable, so they can be shared between
+    drivers, riders and activities, and used as dictionary keys.
+
     Attributes:
         row: the number of blocks the location is from the bottom\
              edge of the grid.
@@ -13,14 +20,37 @@ class Location:
                 left of the grid.
 
     """
+    __slots__ = ("row", "column")
     row: int
     column: int
 
     def __init__(self, row: int, column: int) -> None:
         """Initialize a location."""
 
-        self.row = row
-        self.column = column
+        object.__setattr__(self, "row", row)
+        object.__setattr__(self, "column", column)
+
+    def __setattr__(self, name: str, value: object) -> None:
+        """Raise AttributeError: locations are immutable.
+
+        >>> Location(1, 2).row = 3
+        Traceback (most recent call last):
+        ...
+        AttributeError: Location is immutable
+        """
+        raise AttributeError("Location is immutable")
+
+    def __delattr__(self, name: str) -> None:
+        """Raise AttributeError: locations are immutable.
+
+        """
+        raise AttributeError("Location is immutable")
+
+    def __reduce__(self) -> Tuple[type, Tuple[int, int]]:
+        """Return the information needed to pickle this location.
+
+        """
+        return Location, (self.row, self.column)
 
     def __str__(self) -> str:
         """Return a string representation.
@@ -34,6 +64,14 @@ class Location:
         """
         return self.row == other.row and self.column == other.column
 
+    def __hash__(self) -> int:
+        """Return a hash value that is consistent with __eq__.
+
+        >>> hash(Location(1, 2)) == hash(Location(1, 2))
+        True
+        """
+        return hash((self.row, self.column))
+
 
 def manhattan_distance(origin: Location, destination: Location) -> int:
     """Return the Manhattan distance between the origin and the destination.
@@ -44,18 +82,31 @@ def manhattan_distance(origin: Location, destination: Location) -> int:
     return int(length_x + length_y)
 
 
+_interned: Dict[str, Location] = {}
+
+
 def deserialize_location(location_str: str) -> Location:
     """Deserialize a location.
 
+    Equal strings deserialize to the same Location object, so an event file
+    with millions of tokens only allocates one object per distinct location.
+
     location_str: A location in the format 'row,col'
-    """
 
-    x_y = location_str.split(',')
-    x, y = int(x_y[0]), int(x_y[1])
-    deserialize = Location(x, y)
+    >>> deserialize_location("4,2") is deserialize_location("4,2")
+    True
+    """
+    deserialize = _interned.get(location_str)
+    if deserialize is None:
+        x_y = location_str.split(',')
+        x, y = int(x_y[0]), int(x_y[1])
+        deserialize = Location(x, y)
+        if len(_interned) >= INTERN_LIMIT:
+            _interned.clear()
+        _interned[location_str] = deserialize
     return deserialize
 
 
 if __name__ == '__main__':
     import python_ta
-    python_ta.check_all()
+    python_ta.check_all(config={'extra-imports': ['typing']})
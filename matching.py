@@ -0,0 +1,82 @@
+"""Minimum-cost assignment for batched dispatching"""
+
+from __future__ import annotations
+from typing import List, Sequence, Tuple
+
+
+def min_cost_assignment(costs: Sequence[Sequence[int]]
+                        ) -> List[Tuple[int, int]]:
+    """Return a minimum-cost assignment for the cost matrix <costs>.
+
+    costs[i][j] is the cost of assigning row i to column j. Every row is
+    assigned to a distinct column if there are at least as many columns as
+    rows, and every column to a distinct row otherwise. The assignment is
+    returned as a list of (row, column) pairs, sorted by row.
+
+    This is the Hungarian algorithm with shortest augmenting paths. It takes
+    O(n^2 m) time, where n is the smaller and m the larger dimension.
+
+    Precondition: all rows of <costs> have the same length.
+
+    >>> min_cost_assignment([[4, 1, 3], [2, 0, 5], [3, 2, 2]])
+    [(0, 1), (1, 0), (2, 2)]
+    >>> min_cost_assignment([[7], [3], [5]])
+    [(1, 0)]
+    >>> min_cost_assignment([])
+    []
+    """
+    if not costs or not costs[0]:
+        return []
+    if len(costs) > len(costs[0]):
+        transposed = [list(column) for column in zip(*costs)]
+        return sorted((i, j) for j, i in min_cost_assignment(transposed))
+
+    n, m = len(costs), len(costs[0])
+    infinity = float("inf")
+    # Potentials for the rows (u) and columns (v), and for each column the
+    # row assigned to it (p) and the previous column on its augmenting path
+    # (way). Everything is 1-indexed, with column 0 as a sentinel.
+    u = [0] * (n + 1)
+    v = [0] * (m + 1)
+    p = [0] * (m + 1)
+    way = [0] * (m + 1)
+    for i in range(1, n + 1):
+        p[0] = i
+        j0 = 0
+        min_v = [infinity] * (m + 1)
+        used = [False] * (m + 1)
+        while p[j0] != 0:
+            used[j0] = True
+            i0 = p[j0]
+            row = costs[i0 - 1]
+            u_i0 = u[i0]
+            delta = infinity
+            j1 = 0
+            for j in range(1, m + 1):
+                if not used[j]:
+                    reduced = row[j - 1] - u_i0 - v[j]
+                    if reduced < min_v[j]:
+                        min_v[j] = reduced
+                        way[j] = j0
+                    if min_v[j] < delta:
+                        delta = min_v[j]
+                        j1 = j
+            for j in range(m + 1):
+                if used[j]:
+                    u[p[j]] += delta
+                    v[j] -= delta
+                else:
+                    min_v[j] -= delta
+            j0 = j1
+        # Flip the assignments along the augmenting path.
+        while j0 != 0:
+            j1 = way[j0]
+            p[j0] = p[j1]
+            j0 = j1
+
+    return sorted((p[j] - 1, j - 1) for j in range(1, m + 1) if p[j] != 0)
+
+
+if __name__ == '__main__':
+    import python_ta
+    python_ta.check_all(config={'extra-imports': ['typing']})
@@ -1,12 +1,15 @@
 """
-The Monitor module contains the Monitor class, the Activity class,
-and a collection of constants. Together the elements of the module
-help keep a record of activities that have occurred.
+The Monitor module contains the Monitor class, the Activity class, the
+ActivityLog class and a collection of constants. Together the elements of
+the module help keep a record of activities that have occurred.
 
 Activities fall into two categories: Rider activities and Driver
 activities. Each activity also has a description, which is one of
 request, cancel, pickup, or dropoff.
 
+Categories and descriptions are small integers (members of Category and
+Description); their string forms, e.g. "rider", are only used for display.
+
 === Constants ===
 RIDER: A constant used for the Rider activity category.
 DRIVER: A constant used for the Driver activity category.
@@ -16,17 +19,71 @@ PICKUP: A constant used for the pickup activity description.
 DROPOFF: A constant used for the dropoff activity description.
 """
 from __future__ import annotations
-from typing import Dict, List
+import csv
+import os
+import struct
+import sys
+from array import array
+from enum import IntEnum
+from collections import deque
+from contextlib import ExitStack
+from typing import Callable, Deque, Dict, Iterator, List, Optional, Tuple
 from location import Location, manhattan_distance
+from sketch import RELATIVE_ACCURACY, QuantileSketch
+
+
+class Category(IntEnum):
+    """The category of an activity.
+
+    >>> str(Category.RIDER)
+    'rider'
+    """
+    RIDER = 0
+    DRIVER = 1
+
+    def __str__(self) -> str:
+        """Return the display form of this category.
+
+        """
+        return self.name.lower()
+
+
+class Description(IntEnum):
+    """The description of an activity.
+
+    >>> str(Description.DROPOFF)
+    'dropoff'
+    """
+    REQUEST = 0
+    CANCEL = 1
+    PICKUP = 2
+    DROPOFF = 3
+
+    def __str__(self) -> str:
+        """Return the display form of this description.
+
+        """
+        return self.name.lower()
 
 
-RIDER = "rider"
-DRIVER = "driver"
+RIDER = Category.RIDER
+DRIVER = Category.DRIVER
 
-REQUEST = "request"
-CANCEL = "cancel"
-PICKUP = "pickup"
-DROPOFF = "dropoff"
+REQUEST = Description.REQUEST
+CANCEL = Description.CANCEL
+PICKUP = Description.PICKUP
+DROPOFF = Description.DROPOFF
+
+# The name and array typecode of each column of an ActivityLog.
+LOG_COLUMNS = [("times", "q"), ("categories", "B"), ("descriptions", "B"),
+               ("actors", "I"), ("rows", "q"), ("columns", "q"),
+               ("previous", "q")]
+
+# The percentiles of the rider wait time and pickup distance in a report.
+PERCENTILES = [50, 95, 99]
+
+_BYTE_ORDER = "<" if sys.byteorder == "little" else ">"
+_UTF32 = "utf-32-le" if sys.byteorder == "little" else "utf-32-be"
 
 
 class Activity:
@@ -38,14 +95,14 @@ class Activity:
     identifier: An identifier for the person doing the activity.
     location: The location at which the activity occurred.
     """
-
+    __slots__ = ("time", "description", "id", "location")
     time: int
-    description: str
+    description: Description
     id: str
     location: Location
 
-    def __init__(self, timestamp: int, description: str, identifier: str,
-                 location: Location) -> None:
+    def __init__(self, timestamp: int, description: Description,
+                 identifier: str, location: Location) -> None:
         """Initialize an Activity.
 
         """
@@ -55,39 +112,411 @@ class Activity:
         self.location = location
 
     def __repr__(self) -> str:
-        return "{}, {}, {}, {}".format(self.time, self.description, self.id, self.location)
+        return "{}, {}, {}, {}".format(self.time, self.description, self.id,
+                                       self.location)
+
+
+class ActivityLog:
+    """An append-only log of activities, stored column by column.
+
+    Activity i of the log is described by entry i of every column. Each
+    driver and rider is an actor, numbered in the order of their first
+    activity; a driver and a rider with the same id are different actors.
+
+    The previous column links each activity to the one before it by the
+    same actor, so per-actor differences, such as the distance a driver
+    covered between two activities, are a single pass over the columns.
+
+    === Attributes ===
+    names: The id of each actor.
+    actor_categories: The category of each actor.
+    times: The time of each activity.
+    categories: The category of each activity.
+    descriptions: The description of each activity.
+    actors: The actor of each activity.
+    rows: The row of the location of each activity.
+    columns: The column of the location of each activity.
+    previous: The index of the previous activity of the same actor, or -1
+        for the actor's first activity.
+    """
+
+    names: List[str]
+    actor_categories: array
+    times: array
+    categories: array
+    descriptions: array
+    actors: array
+    rows: array
+    columns: array
+    previous: array
+
+    # === Private Attributes ===
+    _index: Tuple[Dict[str, int], ...]
+    #     Maps the id of each actor in each category to its index.
+    _last: array
+    #     The index of the latest activity of each actor.
+
+    def __init__(self) -> None:
+        """Initialize an empty ActivityLog.
+
+        """
+        self.names = []
+        self.actor_categories = array("B")
+        for name, typecode in LOG_COLUMNS:
+            setattr(self, name, array(typecode))
+        self._index = tuple({} for _ in Category)
+        self._last = array("q")
+
+    def __len__(self) -> int:
+        """Return the number of activities in this log.
+
+        """
+        return len(self.times)
+
+    def actor_count(self, category: Category) -> int:
+        """Return the number of actors in <category>.
+
+        """
+        return self.actor_categories.count(category)
+
+    def append(self, timestamp: int, category: Category,
+               description: Description, identifier: str,
+               location: Location) -> None:
+        """Append an activity to this log.
+
+        >>> log = ActivityLog()
+        >>> log.append(1, DRIVER, REQUEST, "Atom", Location(1, 1))
+        >>> log.append(2, RIDER, REQUEST, "Atom", Location(1, 5))
+        >>> log.append(4, DRIVER, PICKUP, "Atom", Location(1, 5))
+        >>> list(log.actors), list(log.previous), log.actor_count(DRIVER)
+        ([0, 1, 0], [-1, -1, 0], 1)
+        """
+        index = self._index[category]
+        actor = index.get(identifier)
+        if actor is None:
+            actor = index[identifier] = len(self.names)
+            self.names.append(identifier)
+            self.actor_categories.append(category)
+            self._last.append(-1)
+        self.previous.append(self._last[actor])
+        self._last[actor] = len(self)
+        self.times.append(timestamp)
+        self.categories.append(category)
+        self.descriptions.append(description)
+        self.actors.append(actor)
+        self.rows.append(location.row)
+        self.columns.append(location.column)
+
+    def chunks(self) -> Iterator[Dict[str, array]]:
+        """Yield the columns of this log one chunk of activities at a time,
+        in order, each as a dictionary from column name to column.
+
+        """
+        yield {name: getattr(self, name) for name, _ in LOG_COLUMNS}
+
+    def activities(self, category: Category) -> Dict[str, List[Activity]]:
+        """Return the activities of each actor in <category>, in order of
+        time, keyed by id.
+
+        >>> log = ActivityLog()
+        >>> log.append(1, DRIVER, REQUEST, "Atom", Location(1, 1))
+        >>> log.append(2, RIDER, REQUEST, "Bam", Location(1, 5))
+        >>> log.append(4, DRIVER, PICKUP, "Atom", Location(1, 5))
+        >>> log.activities(DRIVER)
+        {'Atom': [1, request, Atom, (1, 1), 4, pickup, Atom, (1, 5)]}
+        """
+        activities = {}
+        names = self.names
+        for chunk in self.chunks():
+            for time, kind, description, actor, row, column in zip(
+                    chunk["times"], chunk["categories"],
+                    chunk["descriptions"], chunk["actors"], chunk["rows"],
+                    chunk["columns"]):
+                if kind == category:
+                    activities.setdefault(names[actor], []).append(Activity(
+                        time, Description(description), names[actor],
+                        Location(row, column)))
+        return activities
+
+    def save_npy(self, directory: str) -> None:
+        """Save each column of this log to <directory>/<column>.npy, and the
+        category and id of each actor to <directory>/actor_categories.npy
+        and <directory>/names.npy, in the NumPy file format.
+
+        """
+        with ExitStack() as stack:
+            files = {}
+            for name, typecode in LOG_COLUMNS:
+                files[name] = stack.enter_context(
+                    open(os.path.join(directory, name + ".npy"), "wb"))
+                files[name].write(_npy_header(_npy_type(typecode), len(self)))
+            for chunk in self.chunks():
+                for name, column in chunk.items():
+                    files[name].write(column)
+
+        with open(os.path.join(directory, "actor_categories.npy"),
+                  "wb") as file:
+            file.write(_npy_header(_npy_type("B"), len(self.names)))
+            file.write(self.actor_categories)
+        width = max((len(name) for name in self.names), default=1)
+        with open(os.path.join(directory, "names.npy"), "wb") as file:
+            file.write(_npy_header("{}U{}".format(_BYTE_ORDER, width),
+                                   len(self.names)))
+            for name in self.names:
+                file.write(name.ljust(width, "\0").encode(_UTF32))
+
+    def save_csv(self, filename: str) -> None:
+        """Save this log to <filename> in CSV format, one activity per row.
+
+        """
+        with open(filename, "w", newline="") as file:
+            writer = csv.writer(file)
+            writer.writerow(["time", "category", "description", "id",
+                             "row", "column"])
+            names = self.names
+            for chunk in self.chunks():
+                for time, category, description, actor, row, column in zip(
+                        chunk["times"], chunk["categories"],
+                        chunk["descriptions"], chunk["actors"],
+                        chunk["rows"], chunk["columns"]):
+                    writer.writerow([time, Category(category),
+                                     Description(description), names[actor],
+                                     row, column])
+
+
+def _npy_type(typecode: str) -> str:
+    """Return the NumPy type of the items of an array with <typecode>.
+
+    >>> _npy_type("B")
+    '|u1'
+    """
+    itemsize = array(typecode).itemsize
+    kind = "u" if typecode.isupper() else "i"
+    order = "|" if itemsize == 1 else _BYTE_ORDER
+    return "{}{}{}".format(order, kind, itemsize)
+
+
+def _npy_header(descr: str, length: int) -> bytes:
+    """Return the header of a file in version 1.0 of the NumPy file format
+    for a one-dimensional array of <length> items of NumPy type <descr>.
+
+    """
+    header = "{{'descr': '{}', 'fortran_order': False, 'shape': ({},), }}" \
+        .format(descr, length)
+    # The header is padded with spaces and ends with a newline, so that the
+    # data starts at a multiple of 64 bytes.
+    header += " " * (-(len(header) + 11) % 64) + "\n"
+    return (b"\x93NUMPY\x01\x00" + struct.pack("<H", len(header)) +
+            header.encode("latin1"))
+
+
+class WindowStats:
+    """The activities in a window of simulated time.
+
+    === Attributes ===
+    start: The first time in the window.
+    requests: The number of riders that requested a driver.
+    pickups: The number of riders that were picked up.
+    cancellations: The number of riders that cancelled their ride.
+    wait_time: The total wait time of the riders that finished waiting.
+    waited: The number of riders that finished waiting, i.e. that were
+        picked up or cancelled.
+    idle_drivers: The number of idle drivers at the end of the window, or
+        None if it is not known.
+    waiting_riders: The number of riders waiting for a driver at the end of
+        the window, or None if it is not known.
+    """
+    __slots__ = ("start", "requests", "pickups", "cancellations",
+                 "wait_time", "waited", "idle_drivers", "waiting_riders")
+    start: int
+    requests: int
+    pickups: int
+    cancellations: int
+    wait_time: int
+    waited: int
+    idle_drivers: Optional[int]
+    waiting_riders: Optional[int]
+
+    def __init__(self, start: int) -> None:
+        """Initialize the WindowStats of an empty window starting at
+        <start>.
+
+        """
+        self.start = start
+        self.requests = 0
+        self.pickups = 0
+        self.cancellations = 0
+        self.wait_time = 0
+        self.waited = 0
+        self.idle_drivers = None
+        self.waiting_riders = None
+
+    def __repr__(self) -> str:
+        return ("WindowStats(start={}, requests={}, pickups={}, "
+                "cancellations={}, mean_wait={}, idle_drivers={}, "
+                "waiting_riders={})").format(
+                    self.start, self.requests, self.pickups,
+                    self.cancellations, self.mean_wait, self.idle_drivers,
+                    self.waiting_riders)
+
+    @property
+    def mean_wait(self) -> float:
+        """The mean wait time of the riders that finished waiting in this
+        window, or 0.0 if there were none.
+
+        """
+        return self.wait_time / self.waited if self.waited else 0.0
+
+
+class WindowedMetrics:
+    """Metrics for consecutive windows of <window> units of simulated time.
+
+    A monitor with WindowedMetrics updates the statistics of the current
+    window as it is notified. As soon as it is notified of an activity past
+    the end of the window, the window is closed: it is appended to
+    <history>, which keeps only the latest windows, and passed to
+    <callback>, if there is one. Every window is closed, including those in
+    which nothing happened, and the last one is closed by flush().
+
+    If <gauges> is set, it is called as each window closes and returns the
+    number of idle drivers and of waiting riders at that time. A Simulation
+    sets it from its dispatcher.
+
+    === Attributes ===
+    window: The length of each window.
+    history: The latest closed windows, oldest first.
+    callback: A function called with each window as it closes, or None.
+    gauges: A function returning the number of idle drivers and of waiting
+        riders, or None.
+    current: The window being filled, or None before the first activity.
+
+    >>> windows = WindowedMetrics(10)
+    >>> monitor = Monitor(windows=windows)
+    >>> monitor.notify(3, RIDER, REQUEST, "Bam", Location(1, 1))
+    >>> monitor.notify(12, RIDER, PICKUP, "Bam", Location(1, 1))
+    >>> monitor.notify(35, RIDER, REQUEST, "Cid", Location(1, 1))
+    >>> windows.flush()
+    >>> [(w.start, w.requests, w.pickups, w.mean_wait)
+    ...  for w in windows.history]
+    [(0, 1, 0, 0.0), (10, 0, 1, 9.0), (20, 0, 0, 0.0), (30, 1, 0, 0.0)]
+    """
+
+    window: int
+    history: Deque[WindowStats]
+    callback: Optional[Callable[[WindowStats], None]]
+    gauges: Optional[Callable[[], Tuple[int, int]]]
+    current: Optional[WindowStats]
+
+    def __init__(self, window: int, history: int = 1024,
+                 callback: Optional[Callable[[WindowStats], None]] = None
+                 ) -> None:
+        """Initialize WindowedMetrics for windows of <window> time units
+        that keeps the latest <history> windows.
+
+        """
+        self.window = window
+        self.history = deque(maxlen=history)
+        self.callback = callback
+        self.gauges = None
+        self.current = None
+
+    def notify(self, timestamp: int, category: Category,
+               description: Description, wait: Optional[int]) -> None:
+        """Record an activity at <timestamp>. <wait> is the wait time of a
+        rider whose wait this activity ends, and None otherwise.
+
+        """
+        current = self.current
+        if current is None or timestamp >= current.start + self.window:
+            current = self._advance(timestamp)
+        if category == RIDER:
+            if description == REQUEST:
+                current.requests += 1
+            elif description == PICKUP:
+                current.pickups += 1
+            elif description == CANCEL:
+                current.cancellations += 1
+            if wait is not None:
+                current.wait_time += wait
+                current.waited += 1
+
+    def flush(self) -> None:
+        """Close the current window, if there is one.
+
+        """
+        if self.current is not None:
+            self._close(self.current)
+            self.current = None
+
+    def _advance(self, timestamp: int) -> WindowStats:
+        """Close every window that ends at or before <timestamp> and return
+        the new current window, which contains it.
+
+        """
+        start = timestamp - timestamp % self.window
+        if self.current is not None:
+            self._close(self.current)
+            for empty in range(self.current.start + self.window, start,
+                               self.window):
+                self._close(WindowStats(empty))
+        self.current = WindowStats(start)
+        return self.current
+
+    def _close(self, window: WindowStats) -> None:
+        """Record <window> as closed.
+
+        """
+        if self.gauges is not None:
+            window.idle_drivers, window.waiting_riders = self.gauges()
+        self.history.append(window)
+        if self.callback is not None:
+            self.callback(window)
 
 
 class Monitor:
     """A monitor keeps a record of activities that it is notified about.
     When required, it generates a report of the activities it has recorded.
+
+    Besides the averages, the report has the PERCENTILES of the rider wait
+    time and of the distance drivers drive to pick up riders, e.g.
+    "rider_wait_time_p95" and "pickup_distance_p99". These are estimated
+    from sketches of bounded size that are updated as the monitor is
+    notified, to within a relative error of <relative_accuracy>.
+
+    === Attributes ===
+    log: The activities the monitor has been notified about, in order.
+    wait_times: A sketch of the wait time of every rider that has either
+        been picked up or has cancelled their ride.
+    pickup_distances: A sketch of the distance driven to every pickup.
+    windows: The metrics of each window of simulated time, or None if they
+        are not kept.
     """
 
-    # === Private Attributes ===
-    _activities: Dict[str, Dict[str, List[Activity]]]
-    #       A dictionary whose key is a category, and value is another
-    #       dictionary. The key of the second dictionary is an identifier
-    #       and its value is a list of Activities.
+    log: ActivityLog
+    wait_times: QuantileSketch
+    pickup_distances: QuantileSketch
+    windows: Optional[WindowedMetrics]
 
-    def __init__(self) -> None:
+    def __init__(self, relative_accuracy: float = RELATIVE_ACCURACY,
+                 windows: Optional[WindowedMetrics] = None) -> None:
         """Initialize a Monitor.
 
         """
-        self._activities = {
-            RIDER: {},
-            DRIVER: {}
-        }
-        """@type _activities: dict[str, dict[str, list[Activity]]]"""
+        self.log = ActivityLog()
+        self.wait_times = QuantileSketch(relative_accuracy)
+        self.pickup_distances = QuantileSketch(relative_accuracy)
+        self.windows = windows
 
     def __str__(self) -> str:
         """Return a string representation.
 
         """
         return "Monitor ({} drivers, {} riders)".format(
-            len(self._activities[DRIVER]), len(self._activities[RIDER]))
+            self.log.actor_count(DRIVER), self.log.actor_count(RIDER))
 
-    def notify(self, timestamp: int, category: str, description: str,
-               identifier: str, location: Location) -> None:
+    def notify(self, timestamp: int, category: Category,
+               description: Description, identifier: str,
+               location: Location) -> None:
         """Notify the monitor of the activity.
 
         timestamp: The time of the activity.
@@ -97,34 +526,51 @@ class Monitor:
         identifier: The identifier for the actor.
         location: The location of the activity.
         """
-        if identifier not in self._activities[category]:
-            self._activities[category][identifier] = []
-
-        activity = Activity(timestamp, description, identifier, location)
-        self._activities[category][identifier].append(activity)
+        log = self.log
+        log.append(timestamp, category, description, identifier, location)
+        before = log.previous[-1]
+        wait = None
+        if before >= 0:
+            if category == RIDER:
+                if log.previous[before] < 0:
+                    wait = timestamp - log.times[before]
+                    self.wait_times.add(wait)
+            elif description == PICKUP:
+                self.pickup_distances.add(
+                    abs(location.row - log.rows[before]) +
+                    abs(location.column - log.columns[before]))
+        if self.windows is not None:
+            self.windows.notify(timestamp, category, description, wait)
 
     def report(self) -> Dict[str, float]:
         """Return a report of the activities that have occurred.
 
         """
-        return {"rider_wait_time": self._average_wait_time(),
-                "driver_total_distance": self._average_total_distance(),
-                "driver_ride_distance": self._average_ride_distance()}
+        report = {"rider_wait_time": self._average_wait_time(),
+                  "driver_total_distance": self._average_total_distance(),
+                  "driver_ride_distance": self._average_ride_distance()}
+        for name, sketch in [("rider_wait_time", self.wait_times),
+                             ("pickup_distance", self.pickup_distances)]:
+            for percentile in PERCENTILES:
+                report["{}_p{}".format(name, percentile)] = \
+                    sketch.quantile(percentile / 100)
+        return report
 
     def _average_wait_time(self) -> float:
         """Return the average wait time of riders that have either been picked
         up or have cancelled their ride.
 
         """
+        log = self.log
+        times, previous = log.times, log.previous
         wait_time = 0
         count = 0
-        for activities in self._activities[RIDER].values():
-            # A rider that has less than two activities hasn't finished
-            # waiting (they haven't cancelled or been picked up).
-            if len(activities) >= 2:
-                # The first activity is REQUEST, and the second is PICKUP
-                # or CANCEL. The wait time is the difference between the two.
-                wait_time += activities[1].time - activities[0].time
+        for time, category, before in zip(times, log.categories, previous):
+            # A rider's wait ends with their second activity: the first is
+            # REQUEST, and the second is PICKUP or CANCEL. The wait time is
+            # the difference between the two.
+            if category == RIDER and before >= 0 and previous[before] < 0:
+                wait_time += time - times[before]
                 count += 1
         return wait_time / count
 
@@ -132,32 +578,142 @@ class Monitor:
         """Return the average distance drivers have driven.
 
         """
-
+        log = self.log
+        rows, columns = log.rows, log.columns
         total_distance = 0
-        rides = 0
-        for activities in self._activities[DRIVER].values():
-            for i in range(1, len(activities)):
-                total_distance += manhattan_distance(
-                    activities[i].location,
-                    activities[i-1].location)
-            rides += 1
-        return total_distance / rides
+        for category, before, row, column in zip(
+                log.categories, log.previous, rows, columns):
+            if category == DRIVER and before >= 0:
+                total_distance += \
+                    abs(row - rows[before]) + abs(column - columns[before])
+        return total_distance / log.actor_count(DRIVER)
 
     def _average_ride_distance(self) -> float:
         """Return the average distance drivers have driven on rides.
 
         """
-
+        log = self.log
+        rows, columns = log.rows, log.columns
         total_distance = 0
-        num_rides = 0
-        for activities in self._activities[DRIVER].values():
-            for i in range(1, len(activities)):
-                if activities[i].description == DROPOFF:
-                    total_distance += manhattan_distance(
-                        activities[i].location,
-                        activities[i-1].location)
-            num_rides += 1
-        return total_distance / num_rides
+        for category, description, before, row, column in zip(
+                log.categories, log.descriptions, log.previous, rows,
+                columns):
+            if category == DRIVER and description == DROPOFF and \
+                    before >= 0:
+                total_distance += \
+                    abs(row - rows[before]) + abs(column - columns[before])
+        return total_distance / log.actor_count(DRIVER)
+
+
+class StreamingMonitor(Monitor):
+    """A monitor that keeps running totals instead of a record of every
+    activity.
+
+    Its report is the same as a Monitor's for the same activities, but it
+    takes constant time, and only a little state is kept for each driver and
+    rider. Its log is left empty.
+
+    >>> monitor = StreamingMonitor()
+    >>> monitor.notify(1, DRIVER, REQUEST, "Atom", Location(1, 1))
+    >>> monitor.notify(2, RIDER, REQUEST, "Bam", Location(1, 3))
+    >>> monitor.notify(3, DRIVER, PICKUP, "Atom", Location(1, 3))
+    >>> monitor.notify(3, RIDER, PICKUP, "Bam", Location(1, 3))
+    >>> monitor.notify(6, DRIVER, DROPOFF, "Atom", Location(4, 3))
+    >>> monitor.report()["driver_ride_distance"]
+    3.0
+    """
+
+    # === Private Attributes ===
+    _request_times: Dict[str, Optional[int]]
+    #     Maps each rider to the time of their first activity, or to None
+    #     once they have finished waiting.
+    _wait_time: int
+    #     The total wait time of the riders that have finished waiting.
+    _waited: int
+    #     The number of riders that have finished waiting.
+    _locations: Dict[str, Location]
+    #     Maps each driver to the location of their latest activity.
+    _total_distance: int
+    #     The total distance between consecutive driver activities.
+    _ride_distance: int
+    #     The total distance between driver activities and the dropoffs that
+    #     follow them.
+
+    def __init__(self, relative_accuracy: float = RELATIVE_ACCURACY,
+                 windows: Optional[WindowedMetrics] = None) -> None:
+        """Initialize a StreamingMonitor.
+
+        """
+        super().__init__(relative_accuracy, windows)
+        self._request_times = {}
+        self._wait_time = 0
+        self._waited = 0
+        self._locations = {}
+        self._total_distance = 0
+        self._ride_distance = 0
+
+    def __str__(self) -> str:
+        """Return a string representation.
+
+        """
+        return "Monitor ({} drivers, {} riders)".format(
+            len(self._locations), len(self._request_times))
+
+    def notify(self, timestamp: int, category: Category,
+               description: Description, identifier: str,
+               location: Location) -> None:
+        """Notify the monitor of the activity.
+
+        timestamp: The time of the activity.
+        category: The category (DRIVER or RIDER) for the activity.
+        description: A description (REQUEST | CANCEL | PICKUP | DROP_OFF)
+            of the activity.
+        identifier: The identifier for the actor.
+        location: The location of the activity.
+        """
+        wait = None
+        if category == RIDER:
+            requested = self._request_times.get(identifier, -1)
+            if requested == -1:
+                self._request_times[identifier] = timestamp
+            elif requested is not None:
+                # This is the rider's second activity, which ends the wait.
+                wait = timestamp - requested
+                self._wait_time += wait
+                self.wait_times.add(wait)
+                self._waited += 1
+                self._request_times[identifier] = None
+        else:
+            previous = self._locations.get(identifier)
+            if previous is not None:
+                distance = manhattan_distance(location, previous)
+                self._total_distance += distance
+                if description == DROPOFF:
+                    self._ride_distance += distance
+                elif description == PICKUP:
+                    self.pickup_distances.add(distance)
+            self._locations[identifier] = location
+        if self.windows is not None:
+            self.windows.notify(timestamp, category, description, wait)
+
+    def _average_wait_time(self) -> float:
+        """Return the average wait time of riders that have either been picked
+        up or have cancelled their ride.
+
+        """
+        return self._wait_time / self._waited
+
+    def _average_total_distance(self) -> float:
+        """Return the average distance drivers have driven.
+
+        """
+        return self._total_distance / len(self._locations)
+
+    def _average_ride_distance(self) -> float:
+        """Return the average distance drivers have driven on rides.
+
+        """
+        return self._ride_distance / len(self._locations)
 
 
 if __name__ == "__main__":
@@ -165,4 +721,6 @@ if __name__ == "__main__":
     python_ta.check_all(
         config={
             'max-args': 6,
-            'extra-imports': ['typing', 'location']})
+            'extra-imports': ['array', 'collections', 'contextlib', 'csv',
+                              'enum', 'os', 'struct', 'sys', 'typing',
+                              'location', 'sketch']})
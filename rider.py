@@ -2,18 +2,39 @@
 The rider module contains the Rider class. It also contains
 constants that represent the status of the rider.
 
+The statuses are small integers (members of RiderStatus); their string
+forms, e.g. "waiting", are only used for display.
+
 === Constants ===
 WAITING: A constant used for the waiting rider status.
 CANCELLED: A constant used for the cancelled rider status.
 SATISFIED: A constant used for the satisfied rider status
 """
 from __future__ import annotations
+from enum import IntEnum
 from location import Location
 
 
-WAITING = "waiting"
-CANCELLED = "cancelled"
-SATISFIED = "satisfied"
+class RiderStatus(IntEnum):
+    """The status of a rider.
+
+    >>> str(RiderStatus.WAITING)
+    'waiting'
+    """
+    WAITING = 0
+    CANCELLED = 1
+    SATISFIED = 2
+
+    def __str__(self) -> str:
+        """Return the display form of this status.
+
+        """
+        return self.name.lower()
+
+
+WAITING = RiderStatus.WAITING
+CANCELLED = RiderStatus.CANCELLED
+SATISFIED = RiderStatus.SATISFIED
 
 
 class Rider:
@@ -29,11 +50,12 @@ class Rider:
         status: One of waiting to be picked up, cancelled or satisfied.
 
     """
+    __slots__ = ("id", "patience", "origin", "destination", "status")
     id: str
     patience: int
     origin: Location
     destination: Location
-    status: WAITING or CANCELLED or SATISFIED
+    status: RiderStatus
 
     def __init__(self, identifier: str, patience: int, origin: Location,
                  destination: Location) -> None:
@@ -67,4 +89,4 @@ class Rider:
 
 if __name__ == '__main__':
     import python_ta
-    python_ta.check_all(config={'extra-imports': ['location']})
+    python_ta.check_all(config={'extra-imports': ['enum', 'location']})
@@ -1,9 +1,12 @@
 """Starting point for simulation"""
 
-from typing import List, Dict
-from container import PriorityQueue
+from operator import attrgetter
+from typing import Dict, Iterable, Optional, Sequence
+from container import Container, PriorityQueue
 from dispatcher import Dispatcher
-from event import Event, create_event_list
+from event import Event, Cancellation, Pickup, EVENT_TYPES, HANDLERS, \
+    iter_events
+from instrument import Instrumentation
 from monitor import Monitor
 
 
@@ -26,58 +29,134 @@ class Simulation:
     """
 
     # === Private Attributes ===
-    _events: PriorityQueue
+    _events: Container
     #     A sequence of events arranged in priority determined by the event
     #     sorting order.
     _dispatcher: Dispatcher
     #     The dispatcher associated with the simulation.
     _monitor: Monitor
     #     The monitor associated with the simulation.
-
-    def __init__(self) -> None:
+    _cancellations: Dict[str, object]
+    #     Maps the id of each rider with a pending Cancellation event to the
+    #     event queue handle of that event.
+    _instrumentation: Optional[Instrumentation]
+    #     The instrumentation recording the run, if any.
+
+    def __init__(self, events: Optional[Container] = None,
+                 dispatcher: Optional[Dispatcher] = None,
+                 monitor: Optional[Monitor] = None,
+                 instrumentation: Optional[Instrumentation] = None) -> None:
         """Initialize a Simulation.
 
+        events: An empty event queue to use instead of the default
+            PriorityQueue, e.g. a BucketQueue.
+        dispatcher: A new dispatcher to use instead of the default
+            Dispatcher, e.g. a BatchDispatcher.
+        monitor: A new monitor to use instead of the default Monitor, e.g.
+            a StreamingMonitor.
+        instrumentation: A new Instrumentation to record the run, whose
+            statistics are added to the report.
         """
-        self._events = PriorityQueue()
-        self._dispatcher = Dispatcher()
-        self._monitor = Monitor()
-
-    def run(self, initial_events: List[Event]) -> Dict[str, float]:
-        """Run the simulation on the list of events in <initial_events>.
+        if events is None:
+            events = PriorityQueue(key=attrgetter("timestamp"))
+        if dispatcher is None:
+            dispatcher = Dispatcher()
+        self._events = events
+        self._dispatcher = dispatcher
+        self._monitor = Monitor() if monitor is None else monitor
+        self._cancellations = {}
+        self._instrumentation = instrumentation
+
+    def run(self, initial_events: Iterable[Event]) -> Dict[str, float]:
+        """Run the simulation on the events in <initial_events>.
 
         Return a dictionary containing statistics of the simulation,
         according to the specifications in the assignment handout.
 
-        initial_events: An initial list of events.
-        """
+        The initial events are not all added to the event queue up front:
+        each one is taken from <initial_events> only once it is due, so an
+        iterator such as iter_events() is read as the simulation goes and
+        only the events in flight are kept in memory.
 
-        for event in initial_events:
-            self._events.add(event)
+        initial_events: An initial list of events, or an iterable of events
+            in non-decreasing order of timestamp.
+        """
+        if isinstance(initial_events, Sequence):
+            # The whole list is known, so it can simply be put in order.
+            # The sort is stable, just as the queue is first-in, first-out.
+            initial_events = sorted(initial_events,
+                                    key=attrgetter("timestamp"))
+        inputs = iter(initial_events)
+        next_input = next(inputs, None)
+        queue = self._events
+
+        # The kinds of events that end a rider's wait, and of Cancellations.
+        cancellations = {cls.kind for cls in EVENT_TYPES
+                         if issubclass(cls, Cancellation)}
+        rider_done = cancellations | {cls.kind for cls in EVENT_TYPES
+                                      if issubclass(cls, Pickup)}
+        pending = self._cancellations
+        dispatcher, monitor = self._dispatcher, self._monitor
+        windows = monitor.windows
+        if windows is not None:
+            windows.gauges = lambda: (len(dispatcher.drivers_waiting),
+                                      len(dispatcher.riders_waiting))
+        instrumentation = self._instrumentation
+        handlers = HANDLERS
+        if instrumentation is not None:
+            handlers = instrumentation.start(queue, dispatcher, HANDLERS)
 
         # Until there are no more events, remove an event
-        # from the event queue and do it. Add any returned
-        # events to the event queue.
-        while not self._events.is_empty():
-            curr = self._events.remove()
-            new = curr.do(self._dispatcher, self._monitor)
+        # from the event queue or the initial events and do it. Add any
+        # returned events to the event queue.
+        while next_input is not None or not queue.is_empty():
+            # An initial event goes before any queued event with the same
+            # timestamp, since it would have been added to the queue first.
+            if next_input is not None and (
+                    queue.is_empty() or
+                    next_input.timestamp <= queue.peek().timestamp):
+                curr = next_input
+                next_input = next(inputs, None)
+                if next_input is not None and \
+                        next_input.timestamp < curr.timestamp:
+                    raise ValueError(
+                        "initial events are not in order of timestamp: "
+                        f"{next_input} comes after {curr}")
+            else:
+                curr = queue.remove()
+            kind = curr.kind
+            if kind in rider_done:
+                # A rider that has been picked up can no longer cancel, so
+                # their Cancellation is dropped from the queue rather than
+                # being popped later only to do nothing.
+                handle = pending.pop(curr.rider.id, None)
+                if handle is not None:
+                    queue.cancel(handle)
+            new = handlers[kind](curr, dispatcher, monitor)
 
             if new is not None:
                 for event in new:
-                    self._events.add(event)
-
-        # Add all initial events to the event queue.
+                    handle = queue.add(event)
+                    if handle is not None and event.kind in cancellations:
+                        pending[event.rider.id] = handle
 
-        return self._monitor.report()
+        if windows is not None:
+            windows.flush()
+        report = self._monitor.report()
+        if instrumentation is not None:
+            instrumentation.stop()
+            report.update(instrumentation.report())
+        return report
 
 
 if __name__ == "__main__":
     import python_ta
     python_ta.check_all(
         config={
-            'extra-imports': ['typing', 'container', 'dispatcher', 'event',
+            'extra-imports': ['operator', 'typing', 'container',
+                              'dispatcher', 'event', 'instrument',
                               'monitor']})
 
-    events = create_event_list("events.txt")
     sim = Simulation()
-    final_stats = sim.run(events)
+    final_stats = sim.run(iter_events("events.txt"))
     print(final_stats)
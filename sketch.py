@@ -0,0 +1,146 @@
+"""Streaming quantile estimates in bounded memory"""
+
+from __future__ import annotations
+import math
+from typing import Dict
+
+# The defaults for QuantileSketch.
+RELATIVE_ACCURACY = 0.01
+MAX_BUCKETS = 2048
+
+
+class QuantileSketch:
+    """A sketch of a distribution of non-negative numbers, from which its
+    quantiles can be estimated.
+
+    Values are counted in buckets whose bounds grow geometrically, as in
+    DDSketch, so every quantile is estimated to within a relative error of
+    <relative_accuracy> however many values are added. At most
+    <max_buckets> buckets are kept: when there would be more, the lowest
+    buckets are merged, which only costs accuracy for the smallest values.
+    With the defaults, that only happens for values spanning more than 17
+    orders of magnitude.
+
+    Sketches with the same relative accuracy can be merged, e.g. to combine
+    the sketches of several simulation runs.
+
+    === Attributes ===
+    relative_accuracy: The relative error of the estimated quantiles.
+    max_buckets: The most buckets kept, not counting the one for zero.
+    count: The number of values added.
+
+    >>> sketch = QuantileSketch()
+    >>> for value in range(1, 101):
+    ...     sketch.add(value)
+    >>> abs(sketch.quantile(0.5) - 50) <= 0.5
+    True
+    >>> abs(sketch.quantile(0.99) - 99) <= 0.99
+    True
+    """
+
+    relative_accuracy: float
+    max_buckets: int
+    count: int
+
+    # === Private Attributes ===
+    _gamma: float
+    #     The ratio between the bounds of consecutive buckets.
+    _log_gamma: float
+    #     The natural logarithm of _gamma.
+    _buckets: Dict[int, int]
+    #     Maps the index i of each non-empty bucket to the number of values
+    #     in it, which lie in (_gamma ** (i - 1), _gamma ** i].
+    _zeros: int
+    #     The number of values that are zero.
+
+    def __init__(self, relative_accuracy: float = RELATIVE_ACCURACY,
+                 max_buckets: int = MAX_BUCKETS) -> None:
+        """Initialize an empty QuantileSketch.
+
+        Precondition: 0 < relative_accuracy < 1 and max_buckets >= 1.
+        """
+        self.relative_accuracy = relative_accuracy
+        self.max_buckets = max_buckets
+        self.count = 0
+        self._gamma = (1 + relative_accuracy) / (1 - relative_accuracy)
+        self._log_gamma = math.log(self._gamma)
+        self._buckets = {}
+        self._zeros = 0
+
+    def __len__(self) -> int:
+        """Return the number of non-empty buckets in this sketch.
+
+        """
+        return len(self._buckets) + (self._zeros > 0)
+
+    def add(self, value: float, count: int = 1) -> None:
+        """Add <count> occurrences of <value> to this sketch.
+
+        Raise ValueError if <value> is negative.
+        """
+        if value > 0:
+            index = math.ceil(math.log(value) / self._log_gamma)
+            self._buckets[index] = self._buckets.get(index, 0) + count
+            if len(self._buckets) > self.max_buckets:
+                self._collapse()
+        elif value == 0:
+            self._zeros += count
+        else:
+            raise ValueError("cannot add a negative value to a sketch")
+        self.count += count
+
+    def merge(self, other: QuantileSketch) -> None:
+        """Add all the values in <other> to this sketch.
+
+        Raise ValueError if <other> has a different relative accuracy.
+
+        >>> first, second = QuantileSketch(), QuantileSketch()
+        >>> first.add(1)
+        >>> second.add(0, 3)
+        >>> first.merge(second)
+        >>> first.count, first.quantile(0.5)
+        (4, 0.0)
+        """
+        if other.relative_accuracy != self.relative_accuracy:
+            raise ValueError("cannot merge sketches of different accuracies")
+        for index, count in other._buckets.items():
+            self._buckets[index] = self._buckets.get(index, 0) + count
+        self._zeros += other._zeros
+        self.count += other.count
+        if len(self._buckets) > self.max_buckets:
+            self._collapse()
+
+    def quantile(self, q: float) -> float:
+        """Return an estimate of the <q>-quantile of the values in this
+        sketch, or nan if it is empty.
+
+        Precondition: 0 <= q <= 1.
+        """
+        if not self.count:
+            return math.nan
+        rank = q * (self.count - 1)
+        seen = self._zeros
+        if seen > rank:
+            return 0.0
+        for index in sorted(self._buckets):
+            seen += self._buckets[index]
+            if seen > rank:
+                # The value with the smallest relative error to every value
+                # in the bucket.
+                return 2 * self._gamma ** index / (self._gamma + 1)
+        return 2 * self._gamma ** max(self._buckets) / (self._gamma + 1)
+
+    def _collapse(self) -> None:
+        """Merge the lowest buckets so that at most max_buckets are left.
+
+        """
+        indices = sorted(self._buckets)
+        excess = len(indices) - self.max_buckets
+        lowest = indices[excess]
+        for index in indices[:excess]:
+            self._buckets[lowest] += self._buckets.pop(index)
+
+
+if __name__ == '__main__':
+    import python_ta
+    python_ta.check_all(config={'extra-imports': ['math', 'typing']})
@@ -0,0 +1,235 @@
+"""Activity logs that spill to disk
+
+A SpillingActivityLog keeps only its latest chunk of activities in memory.
+Each full chunk is handed to a background thread that appends it to a
+segment file, so a run can record more activities than fit in memory while
+the simulation carries on. The segment file is a sequence of chunks, each
+a native-endian unsigned 64-bit count of activities followed by every
+column of the chunk, in the order of LOG_COLUMNS.
+
+A SpillingMonitor folds its statistics as it is notified, as a
+StreamingMonitor does, and records the full history in a
+SpillingActivityLog for analysis after the run.
+"""
+from __future__ import annotations
+import struct
+import threading
+from array import array
+from queue import Queue
+from typing import BinaryIO, Dict, Iterator, Optional
+from location import Location
+from monitor import LOG_COLUMNS, ActivityLog, Category, Description, \
+    StreamingMonitor, WindowedMetrics
+from sketch import RELATIVE_ACCURACY
+
+# The defaults for SpillingActivityLog.
+CHUNK_SIZE = 1 << 16
+MEMORY_BUDGET = 16 << 20
+
+# The number of bytes each activity takes in memory and on disk.
+ROW_BYTES = sum(array(typecode).itemsize for _, typecode in LOG_COLUMNS)
+
+_COUNT = struct.Struct("=Q")
+
+
+class SpillingActivityLog(ActivityLog):
+    """An activity log that appends its activities to a segment file on
+    disk, a chunk of <chunk_size> activities at a time.
+
+    The chunks waiting to be written, together with the chunk being filled,
+    take at most about <memory_budget> bytes: once that many are waiting,
+    append() waits for the writer to catch up. The names of the actors are
+    kept in memory.
+
+    The columns of the log only hold the chunk being filled; chunks()
+    yields every activity, reading the written chunks back from the file.
+    The log must be closed when it is no longer appended to.
+
+    === Attributes ===
+    path: The path of the segment file.
+    chunk_size: The number of activities in each chunk.
+    """
+
+    path: str
+    chunk_size: int
+
+    # === Private Attributes ===
+    _spilled: int
+    #     The number of activities handed to the writer.
+    _file: BinaryIO
+    #     The segment file, open for appending.
+    _pending: Queue
+    #     The chunks waiting to be written, followed by None once the log is
+    #     closed.
+    _writer: threading.Thread
+    #     The thread that writes the chunks in _pending.
+    _error: Optional[BaseException]
+    #     The error that stopped the writer, if any.
+
+    def __init__(self, path: str, chunk_size: int = CHUNK_SIZE,
+                 memory_budget: int = MEMORY_BUDGET) -> None:
+        """Initialize an empty SpillingActivityLog that writes to a new file
+        at <path>.
+
+        """
+        super().__init__()
+        self.path = path
+        self.chunk_size = chunk_size
+        self._spilled = 0
+        self._file = open(path, "wb")
+        self._pending = Queue(max(1, memory_budget //
+                                  (chunk_size * ROW_BYTES) - 1))
+        self._error = None
+        self._writer = threading.Thread(target=self._write, daemon=True)
+        self._writer.start()
+
+    def __len__(self) -> int:
+        """Return the number of activities in this log.
+
+        """
+        return self._spilled + len(self.times)
+
+    def __enter__(self) -> SpillingActivityLog:
+        """Return this log, to be closed at the end of a with block.
+
+        """
+        return self
+
+    def __exit__(self, *exc_info: object) -> None:
+        """Close this log.
+
+        """
+        self.close()
+
+    def append(self, timestamp: int, category: Category,
+               description: Description, identifier: str,
+               location: Location) -> None:
+        """Append an activity to this log.
+
+        """
+        super().append(timestamp, category, description, identifier,
+                       location)
+        if len(self.times) >= self.chunk_size:
+            self._spill()
+
+    def chunks(self) -> Iterator[Dict[str, array]]:
+        """Yield the columns of this log one chunk of activities at a time,
+        in order, each as a dictionary from column name to column.
+
+        Waits for the chunks already handed to the writer to be written.
+        """
+        self._pending.join()
+        self._check()
+        with open(self.path, "rb") as file:
+            remaining = self._spilled
+            while remaining:
+                count = _COUNT.unpack(file.read(_COUNT.size))[0]
+                chunk = {}
+                for name, typecode in LOG_COLUMNS:
+                    column = array(typecode)
+                    column.fromfile(file, count)
+                    chunk[name] = column
+                remaining -= count
+                yield chunk
+        if self.times:
+            yield from super().chunks()
+
+    def close(self) -> None:
+        """Write the chunk being filled and wait for the writer to finish.
+        The log can still be read, but no longer appended to.
+
+        """
+        if self._writer.is_alive():
+            if self.times:
+                self._spill()
+            self._pending.put(None)
+            self._writer.join()
+            self._file.close()
+        self._check()
+
+    def _spill(self) -> None:
+        """Hand the chunk being filled to the writer and start a new one.
+
+        """
+        self._check()
+        chunk = {name: getattr(self, name) for name, _ in LOG_COLUMNS}
+        self._pending.put(chunk)
+        self._spilled += len(self.times)
+        for name, typecode in LOG_COLUMNS:
+            setattr(self, name, array(typecode))
+
+    def _write(self) -> None:
+        """Write chunks to the segment file until None is received.
+
+        """
+        while True:
+            chunk = self._pending.get()
+            try:
+                if chunk is not None and self._error is None:
+                    self._file.write(_COUNT.pack(len(chunk["times"])))
+                    for name, _ in LOG_COLUMNS:
+                        chunk[name].tofile(self._file)
+                    self._file.flush()
+            except OSError as error:
+                self._error = error
+            finally:
+                self._pending.task_done()
+            if chunk is None:
+                return
+
+    def _check(self) -> None:
+        """Raise the error that stopped the writer, if any.
+
+        """
+        if self._error is not None:
+            raise self._error
+
+
+class SpillingMonitor(StreamingMonitor):
+    """A StreamingMonitor that also keeps the full history of activities in
+    a SpillingActivityLog at <path>.
+
+    Its memory is bounded by <memory_budget>, plus a little state for each
+    driver and rider. Its report is the same as a Monitor's.
+
+    === Attributes ===
+    log: The activities the monitor has been notified about, in order.
+    """
+
+    log: SpillingActivityLog
+
+    def __init__(self, path: str, chunk_size: int = CHUNK_SIZE,
+                 memory_budget: int = MEMORY_BUDGET,
+                 relative_accuracy: float = RELATIVE_ACCURACY,
+                 windows: Optional[WindowedMetrics] = None) -> None:
+        """Initialize a SpillingMonitor whose log is written to <path>.
+
+        """
+        super().__init__(relative_accuracy, windows)
+        self.log = SpillingActivityLog(path, chunk_size, memory_budget)
+
+    def notify(self, timestamp: int, category: Category,
+               description: Description, identifier: str,
+               location: Location) -> None:
+        """Notify the monitor of the activity.
+
+        timestamp: The time of the activity.
+        category: The category (DRIVER or RIDER) for the activity.
+        description: A description (REQUEST | CANCEL | PICKUP | DROP_OFF)
+            of the activity.
+        identifier: The identifier for the actor.
+        location: The location of the activity.
+        """
+        super().notify(timestamp, category, description, identifier,
+                       location)
+        self.log.append(timestamp, category, description, identifier,
+                        location)
+
+
+if __name__ == '__main__':
+    import python_ta
+    python_ta.check_all(
+        config={
+            'max-args': 6,
+            'extra-imports': ['array', 'queue', 'struct', 'threading',
+                              'typing', 'location', 'monitor', 'sketch']})
@@ -0,0 +1,345 @@
+"""Parameter sweeps over simulations
+
+A sweep runs the simulation of one event file under many configurations,
+fanned out over a pool of worker processes. A configuration is a dictionary
+of settings:
+
+    drivers: use only the first <drivers> drivers of the event file
+    speed: the speed of every driver
+    patience: the patience of every rider
+    dispatcher: "default" or "batch"
+    window: the window of a batch dispatcher (default 5)
+    monitor: "default" or "streaming"
+
+Settings that are left out keep the values of the event file and the
+defaults of Simulation. The drivers, riders, dispatcher and monitor of
+every run are built afresh, from an event file that is only loaded once: a
+binary event file is memory-mapped by each worker, and a text event file
+is parsed once by the sweep and shared with the workers in shared memory.
+
+Results are streamed back as runs finish. If a results file is given, each
+result is appended to it as a line of JSON, and configurations that already
+have a result there are not run again, so an interrupted sweep picks up
+where it stopped.
+
+Run a sweep from the command line, e.g.
+
+    python sweep.py events.txt --drivers 100 200 --speed 1 2 --timeout 60
+"""
+from __future__ import annotations
+import argparse
+import csv
+import itertools
+import json
+import os
+import signal
+import sys
+from multiprocessing import Pool
+from multiprocessing.shared_memory import SharedMemory
+from typing import Dict, Iterable, Iterator, List, Optional, TextIO, Tuple
+from dispatcher import BatchDispatcher, Dispatcher
+from event import DriverRequest, Event, RiderRequest
+from eventfile import EventColumns, attach_event_columns, open_event_file, \
+    parse_file
+from monitor import Monitor, StreamingMonitor
+from simulation import Simulation
+
+# The settings a configuration may have.
+SETTINGS = ["drivers", "speed", "patience", "dispatcher", "window",
+            "monitor"]
+
+Config = Dict[str, object]
+Result = Dict[str, object]
+
+
+class RunTimeout(Exception):
+    """Raised in a run that takes longer than its timeout."""
+
+
+# The event files loaded by this process, keyed by path.
+_loaded: Dict[str, EventColumns] = {}
+
+
+def load_events(path: str) -> EventColumns:
+    """Return the columns of the event file at <path>, which is either a
+    binary or a text event file, loading it only the first time.
+
+    """
+    columns = _loaded.get(path)
+    if columns is None:
+        try:
+            columns = open_event_file(path)
+        except ValueError:
+            columns = parse_file(path, processes=1)
+        _loaded[path] = columns
+    return columns
+
+
+def scenario(columns: EventColumns, config: Config) -> Iterator[Event]:
+    """Yield the initial events of <columns> with the settings in <config>
+    applied to the drivers and riders.
+
+    """
+    drivers = config.get("drivers")
+    speed = config.get("speed")
+    patience = config.get("patience")
+    seen = 0
+    for event in columns.events():
+        if isinstance(event, DriverRequest):
+            seen += 1
+            if drivers is not None and seen > drivers:
+                continue
+            if speed is not None:
+                driver = event.driver
+                driver.fleet.speeds[driver.index] = speed
+        elif isinstance(event, RiderRequest) and patience is not None:
+            event.rider.patience = patience
+        yield event
+
+
+def make_simulation(config: Config) -> Simulation:
+    """Return a new Simulation with the dispatcher and monitor of <config>.
+
+    Raise ValueError if <config> names an unknown dispatcher or monitor.
+    """
+    name = config.get("dispatcher", "default")
+    if name == "default":
+        dispatcher = Dispatcher()
+    elif name == "batch":
+        dispatcher = BatchDispatcher(config.get("window", 5))
+    else:
+        raise ValueError("unknown dispatcher: {}".format(name))
+    name = config.get("monitor", "default")
+    if name == "default":
+        monitor = Monitor()
+    elif name == "streaming":
+        monitor = StreamingMonitor()
+    else:
+        raise ValueError("unknown monitor: {}".format(name))
+    return Simulation(dispatcher=dispatcher, monitor=monitor)
+
+
+def run(path: str, config: Config,
+        timeout: Optional[float] = None) -> Result:
+    """Run the simulation of the event file at <path> with <config>, and
+    return the configuration together with either its report or the error
+    that stopped it.
+
+    If <timeout> is given, a run that takes longer than <timeout> seconds
+    is stopped. Timeouts need SIGALRM, so they are ignored on platforms
+    without it.
+    """
+    timed = timeout is not None and hasattr(signal, "SIGALRM")
+    if timed:
+        previous = signal.signal(signal.SIGALRM, _alarm)
+        signal.setitimer(signal.ITIMER_REAL, timeout)
+    try:
+        simulation = make_simulation(config)
+        report = simulation.run(scenario(load_events(path), config))
+        result = {"config": config, "report": report}
+    except RunTimeout:
+        result = {"config": config,
+                  "error": "timed out after {}s".format(timeout)}
+    except Exception as error:  # pylint: disable=broad-except
+        result = {"config": config, "error": repr(error)}
+    finally:
+        if timed:
+            signal.setitimer(signal.ITIMER_REAL, 0)
+            signal.signal(signal.SIGALRM, previous)
+    return result
+
+
+def _alarm(signum: int, frame: object) -> None:
+    """Stop the current run.
+
+    """
+    raise RunTimeout()
+
+
+def _run(task: Tuple[str, Config, Optional[float]]) -> Result:
+    """Run the task (<path>, <config>, <timeout>) in a worker process.
+
+    """
+    return run(*task)
+
+
+def completed(results_path: str) -> List[Result]:
+    """Return the results in the results file at <results_path> of the runs
+    that finished without an error, or [] if there is no such file.
+
+    """
+    if not os.path.exists(results_path):
+        return []
+    results = []
+    with open(results_path) as file:
+        for line in file:
+            # A line cut short by an interrupted sweep is ignored.
+            try:
+                result = json.loads(line)
+            except ValueError:
+                continue
+            if "report" in result:
+                results.append(result)
+    return results
+
+
+def sweep(path: str, configs: Iterable[Config],
+          processes: Optional[int] = None, timeout: Optional[float] = None,
+          results_path: Optional[str] = None) -> Iterator[Result]:
+    """Run the simulation of the event file at <path> with each
+    configuration in <configs>, on <processes> worker processes (by default,
+    one per core), and yield the result of each run as it finishes.
+
+    Each run is stopped after <timeout> seconds, if given. If <results_path>
+    is given, each result is appended to it, and the configurations that
+    already have a result there are yielded from it rather than run again.
+    """
+    wanted = {_key(config): config for config in configs}
+    done = completed(results_path) if results_path else []
+    finished = set()
+    for result in done:
+        key = _key(result["config"])
+        if key in wanted and key not in finished:
+            finished.add(key)
+            yield result
+    tasks = [(path, config, timeout) for key, config in wanted.items()
+             if key not in finished]
+    if not tasks:
+        return
+    output = open(results_path, "a") if results_path else None
+    block = None
+    try:
+        if processes == 1:
+            results = map(_run, tasks)
+            yield from _record(results, output)
+        else:
+            block = _share(path)
+            with Pool(processes, _attach,
+                      (path, None if block is None else block.name)) as pool:
+                results = pool.imap_unordered(_run, tasks)
+                yield from _record(results, output)
+    finally:
+        if output is not None:
+            output.close()
+        if block is not None:
+            block.close()
+            block.unlink()
+
+
+def _share(path: str) -> Optional[SharedMemory]:
+    """Return a block of shared memory with the columns of the text event
+    file at <path>, or None if it is a binary event file, which the workers
+    can map themselves.
+
+    """
+    try:
+        open_event_file(path).close()
+        return None
+    except ValueError:
+        columns = parse_file(path)
+    return columns.share()
+
+
+def _attach(path: str, name: Optional[str]) -> None:
+    """Start a worker process: if <name> is given, use the columns in the
+    block of shared memory called <name> as those of the event file at
+    <path>.
+
+    """
+    if name is not None:
+        _loaded[path] = attach_event_columns(name)
+
+
+def _record(results: Iterable[Result], output: Optional[TextIO]
+            ) -> Iterator[Result]:
+    """Yield each of <results>, first appending it to <output>, if given.
+
+    """
+    for result in results:
+        if output is not None:
+            output.write(json.dumps(result) + "\n")
+            output.flush()
+        yield result
+
+
+def _key(config: Config) -> str:
+    """Return a key identifying <config>.
+
+    """
+    return json.dumps(config, sort_keys=True)
+
+
+def grid(**values: List[object]) -> List[Config]:
+    """Return every configuration with one of the <values> of each setting.
+
+    >>> grid(drivers=[10, 20], speed=[1])
+    [{'drivers': 10, 'speed': 1}, {'drivers': 20, 'speed': 1}]
+    """
+    names = list(values)
+    return [dict(zip(names, combination))
+            for combination in itertools.product(*values.values())]
+
+
+def table(results: Iterable[Result]) -> List[Dict[str, object]]:
+    """Return <results> as the rows of a table: the settings of each run
+    followed by its report or error.
+
+    >>> table([{"config": {"speed": 1}, "report": {"wait": 2.0}},
+    ...        {"config": {"speed": 2}, "error": "timed out"}])
+    [{'speed': 1, 'wait': 2.0}, {'speed': 2, 'error': 'timed out'}]
+    """
+    rows = []
+    for result in results:
+        row = dict(result["config"])
+        if "report" in result:
+            row.update(result["report"])
+        else:
+            row["error"] = result["error"]
+        rows.append(row)
+    return rows
+
+
+def main() -> None:
+    """Run the sweep described on the command line and print its results
+    as CSV.
+
+    """
+    parser = argparse.ArgumentParser(
+        description="Run a simulation under many configurations.")
+    parser.add_argument("events", help="a text or binary event file")
+    for name in SETTINGS:
+        kind = str if name in ("dispatcher", "monitor") else int
+        parser.add_argument("--" + name.replace("_", "-"), nargs="+",
+                            type=kind, dest=name,
+                            help="values of the {} setting".format(name))
+    parser.add_argument("--processes", type=int,
+                        help="worker processes (default: one per core)")
+    parser.add_argument("--timeout", type=float,
+                        help="seconds before a run is stopped")
+    parser.add_argument("--results",
+                        help="a JSON lines file to record results in and "
+                             "resume from")
+    args = parser.parse_args()
+    values = {name: getattr(args, name) for name in SETTINGS
+              if getattr(args, name) is not None}
+    configs = grid(**values)
+    results = []
+    for result in sweep(args.events, configs, args.processes, args.timeout,
+                        args.results):
+        results.append(result)
+        print("{} of {} runs done".format(len(results), len(configs)),
+              file=sys.stderr)
+    # Runs finish in any order, so list them in the order of the grid.
+    order = {_key(config): i for i, config in enumerate(configs)}
+    results.sort(key=lambda result: order.get(_key(result["config"]), -1))
+    rows = table(results)
+    columns = []
+    for row in rows:
+        columns.extend(column for column in row if column not in columns)
+    writer = csv.DictWriter(sys.stdout, columns)
+    writer.writeheader()
+    writer.writerows(rows)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,268 @@
+"""Synthetic workloads for the simulation
+
+A Workload describes a fleet of drivers and a stream of riders, and
+generates their requests from a seeded random number generator, so the same
+workload always gives the same events. The events are generated one at a
+time, so a workload of tens of millions of riders takes constant memory
+(apart from the drivers themselves), either as Event objects or as lines in
+the format of events.txt.
+
+All the drivers request a rider at time 0. Riders arrive as a Poisson
+process whose rate is multiplied during rush hours, and their origins and
+destinations are drawn either around hotspots or uniformly over the grid.
+
+Write a workload in the text format from the command line, e.g.
+
+    python workload.py events.txt --drivers 1000 --riders 1000000 \\
+        --hotspot 100,100,20,0.5 --rush-hour 420,600,3
+"""
+from __future__ import annotations
+import argparse
+import math
+import random
+from typing import Callable, Iterator, Optional, Sequence, Tuple
+from driver import Driver
+from event import DriverRequest, Event, RiderRequest
+from fleet import Fleet
+from location import Location
+from rider import Rider, WAITING
+
+# A request: its timestamp, kind, id, origin, destination (None for a
+# driver) and speed or patience.
+Request = Tuple[int, str, str, Tuple[int, int], Optional[Tuple[int, int]],
+                int]
+
+
+class Workload:
+    """The parameters of a synthetic workload.
+
+    === Attributes ===
+    grid_size: The width and height of the grid, in blocks.
+    drivers: The number of drivers.
+    speeds: The speeds drivers are drawn from, uniformly.
+    riders: The number of riders.
+    rate: The average number of riders arriving per time unit.
+    rush_hours: (start, end, multiplier) for each rush hour: the rate is
+        multiplied by multiplier from start to end of every period.
+    period: The length of a period, e.g. of a day, for the rush hours.
+    hotspots: (row, column, spread, weight) for each hotspot: a location is
+        drawn around (row, column) with a standard deviation of spread,
+        with probability weight. Otherwise it is drawn uniformly.
+    patience: How the patience of riders is drawn: "fixed:P", for a
+        patience of P; "uniform:A:B", for a patience between A and B; or
+        "exponential:M", for an exponential patience with mean M.
+    seed: The seed of the random number generator.
+    """
+
+    grid_size: int
+    drivers: int
+    speeds: Sequence[int]
+    riders: int
+    rate: float
+    rush_hours: Sequence[Tuple[int, int, float]]
+    period: int
+    hotspots: Sequence[Tuple[int, int, float, float]]
+    patience: str
+    seed: int
+
+    def __init__(self, grid_size: int = 500, drivers: int = 1000,
+                 speeds: Sequence[int] = (1, 2, 3), riders: int = 10000,
+                 rate: float = 10.0,
+                 rush_hours: Sequence[Tuple[int, int, float]] = (),
+                 period: int = 1440,
+                 hotspots: Sequence[Tuple[int, int, float, float]] = (),
+                 patience: str = "uniform:5:30", seed: int = 0) -> None:
+        """Initialize a Workload.
+
+        Raise ValueError if <patience> is not a valid description or the
+        weights of <hotspots> add up to more than 1.
+        """
+        self.grid_size = grid_size
+        self.drivers = drivers
+        self.speeds = speeds
+        self.riders = riders
+        self.rate = rate
+        self.rush_hours = rush_hours
+        self.period = period
+        self.hotspots = hotspots
+        self.patience = patience
+        self.seed = seed
+        _patience_sampler(patience)
+        if sum(weight for _, _, _, weight in hotspots) > 1:
+            raise ValueError("the hotspot weights add up to more than 1")
+
+    def requests(self) -> Iterator[Request]:
+        """Yield the requests of this workload, in order of time.
+
+        >>> workload = Workload(grid_size=10, drivers=1, riders=3, rate=0.5,
+        ...                     seed=1)
+        >>> for request in workload.requests():
+        ...     print(request)
+        (0, 'DriverRequest', 'd0', (1, 4), None, 1)
+        (1, 'RiderRequest', 'r0', (3, 1), (6, 6), 24)
+        (4, 'RiderRequest', 'r1', (3, 9), (5, 0), 5)
+        (4, 'RiderRequest', 'r2', (6, 3), (0, 8), 12)
+        """
+        rng = random.Random(self.seed)
+        for i in range(self.drivers):
+            yield (0, "DriverRequest", "d{}".format(i), self._location(rng),
+                   None, rng.choice(self.speeds))
+
+        patience = _patience_sampler(self.patience)
+        peak = self.rate * max([1.0] + [multiplier for _, _, multiplier
+                                        in self.rush_hours])
+        time = 0.0
+        for i in range(self.riders):
+            # Arrivals at the peak rate, thinned down to the rate at the
+            # time of each arrival.
+            while True:
+                time += rng.expovariate(peak)
+                if rng.random() * peak < self._rate_at(time):
+                    break
+            yield (int(time), "RiderRequest", "r{}".format(i),
+                   self._location(rng), self._location(rng), patience(rng))
+
+    def lines(self) -> Iterator[str]:
+        """Yield the requests of this workload as lines of an event file,
+        without newlines.
+
+        >>> workload = Workload(grid_size=10, drivers=1, riders=1, seed=1)
+        >>> list(workload.lines())
+        ['0 DriverRequest d0 1,4 1', '0 RiderRequest r0 3,1 6,6 24']
+        """
+        for timestamp, kind, identifier, origin, destination, value \
+                in self.requests():
+            if destination is None:
+                yield "{} {} {} {},{} {}".format(
+                    timestamp, kind, identifier, origin[0], origin[1], value)
+            else:
+                yield "{} {} {} {},{} {},{} {}".format(
+                    timestamp, kind, identifier, origin[0], origin[1],
+                    destination[0], destination[1], value)
+
+    def events(self, fleet: Optional[Fleet] = None) -> Iterator[Event]:
+        """Yield the requests of this workload as events, as iter_events
+        would for the file written by write().
+
+        The drivers are added to <fleet>, or to a new Fleet if none is given.
+        """
+        if fleet is None:
+            fleet = Fleet()
+        for timestamp, kind, identifier, origin, destination, value \
+                in self.requests():
+            if destination is None:
+                driver = Driver(identifier, Location(*origin), value, fleet)
+                yield DriverRequest(timestamp, driver)
+            else:
+                rider = Rider(identifier, value, Location(*origin),
+                              Location(*destination))
+                rider.status = WAITING
+                yield RiderRequest(timestamp, rider)
+
+    def write(self, filename: str) -> None:
+        """Write the requests of this workload to the event file
+        <filename>.
+
+        """
+        with open(filename, "w") as file:
+            for line in self.lines():
+                file.write(line + "\n")
+
+    def _rate_at(self, time: float) -> float:
+        """Return the arrival rate of riders at <time>.
+
+        """
+        offset = time % self.period
+        rate = self.rate
+        for start, end, multiplier in self.rush_hours:
+            if start <= offset < end:
+                rate *= multiplier
+        return rate
+
+    def _location(self, rng: random.Random) -> Tuple[int, int]:
+        """Return a random location on the grid, as (row, column).
+
+        """
+        size = self.grid_size
+        choice = rng.random()
+        for row, column, spread, weight in self.hotspots:
+            if choice < weight:
+                return (min(size - 1, max(0, round(rng.gauss(row, spread)))),
+                        min(size - 1,
+                            max(0, round(rng.gauss(column, spread)))))
+            choice -= weight
+        return rng.randrange(size), rng.randrange(size)
+
+
+def _patience_sampler(description: str
+                      ) -> Callable[[random.Random], int]:
+    """Return a function that draws a patience as given by <description>
+    (see Workload.patience) from a random number generator.
+
+    Raise ValueError if <description> is not valid.
+
+    >>> _patience_sampler("fixed:12")(random.Random(0))
+    12
+    """
+    name, *parameters = description.split(":")
+    try:
+        values = [float(parameter) for parameter in parameters]
+    except ValueError:
+        values = []
+    if name == "fixed" and len(values) == 1:
+        return lambda rng: int(values[0])
+    if name == "uniform" and len(values) == 2:
+        low, high = int(values[0]), int(values[1])
+        return lambda rng: rng.randint(low, high)
+    if name == "exponential" and len(values) == 1:
+        mean = values[0]
+        return lambda rng: math.ceil(rng.expovariate(1 / mean))
+    raise ValueError("invalid patience: {}".format(description))
+
+
+def _numbers(text: str) -> Tuple[float, ...]:
+    """Return the comma-separated numbers in <text>.
+
+    """
+    return tuple(float(number) for number in text.split(","))
+
+
+def main() -> None:
+    """Write the workload described on the command line to an event file.
+
+    """
+    parser = argparse.ArgumentParser(
+        description="Write a synthetic workload to an event file.")
+    parser.add_argument("output", help="the event file to write")
+    parser.add_argument("--grid-size", type=int, default=500)
+    parser.add_argument("--drivers", type=int, default=1000)
+    parser.add_argument("--speeds", type=int, nargs="+", default=[1, 2, 3])
+    parser.add_argument("--riders", type=int, default=10000)
+    parser.add_argument("--rate", type=float, default=10.0,
+                        help="riders per time unit")
+    parser.add_argument("--rush-hour", type=_numbers, action="append",
+                        default=[], metavar="START,END,MULTIPLIER")
+    parser.add_argument("--period", type=int, default=1440,
+                        help="the length of a day, for rush hours")
+    parser.add_argument("--hotspot", type=_numbers, action="append",
+                        default=[], metavar="ROW,COLUMN,SPREAD,WEIGHT")
+    parser.add_argument("--patience", default="uniform:5:30",
+                        help="fixed:P, uniform:A:B or exponential:M")
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+    try:
+        workload = Workload(
+            args.grid_size, args.drivers, args.speeds, args.riders, args.rate,
+            [(start, end, multiplier)
+             for start, end, multiplier in args.rush_hour],
+            args.period,
+            [(row, column, spread, weight)
+             for row, column, spread, weight in args.hotspot],
+            args.patience, args.seed)
+    except ValueError as error:
+        parser.error(str(error))
+    workload.write(args.output)
+
+
+if __name__ == "__main__":
+    main()